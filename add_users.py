@@ -1,5 +1,8 @@
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import generate_password_hash
 from app import app, db
 from models import User
+from view_cache import bump_data_version
 
 # List of intern names to add
 interns = [
@@ -45,36 +48,42 @@ interns = [
     "Anshika Pandey"
 ]
 
+def hash_passwords(passwords):
+    # PBKDF2 is deliberately slow, so spread the hashes over all CPU cores
+    with ProcessPoolExecutor() as executor:
+        return list(executor.map(generate_password_hash, passwords, chunksize=8))
+
 def add_interns():
     with app.app_context():
-        # Add each intern to the database
+        # Skip interns that already exist (full name is the username)
+        existing = {username for (username,) in db.session.query(User.username).filter(User.username.in_(interns))}
+        new_interns = []
         for name in interns:
-            # Use full name as username
-            username = name
-            
-            # Check if user already exists
-            if User.query.filter_by(username=username).first():
-                print(f"User {username} already exists, skipping...")
-                continue
-            
+            if name in existing:
+                print(f"User {name} already exists, skipping...")
+            else:
+                new_interns.append(name)
+        
+        # Default password is the first name in lowercase
+        passwords = [name.split()[0].lower() for name in new_interns]
+        
+        for name, password, password_hash in zip(new_interns, passwords, hash_passwords(passwords)):
             # Create new user
             user = User(
-                username=username,
+                username=name,
                 name=name,
-                role='intern'
+                role='intern',
+                password_hash=password_hash
             )
             
-            # Set default password (first name lowercase)
-            first_name = name.split()[0].lower()
-            user.set_password(first_name)
-            
             # Add to database
             db.session.add(user)
-            print(f"Added user: {name} (username: {username}, password: {first_name})")
+            print(f"Added user: {name} (username: {name}, password: {password})")
         
-        # Commit changes
+        # Commit changes, then have every worker rebuild its cached views
         db.session.commit()
-        print(f"Added {len(interns)} interns to the database")
+        bump_data_version()
+        print(f"Added {len(new_interns)} interns to the database")
 
 if __name__ == "__main__":
     add_interns()
\ No newline at end of file
@@ -0,0 +1,289 @@
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from sqlalchemy import func
+from models import db, User, PMSEntry, PMSDailyRollup
+from shared_cache import shared_cache, MISSING
+from view_cache import data_epoch, plain_rows
+
+# Target used for interns that have no individual target set
+DEFAULT_TARGET = 50
+
+# Entry metrics that are summed per post for the analytics page
+POST_METRICS = ['total_enrollments', 'school_lead_db', 'college_db', 'client_db']
+
+
+def effective_targets(targets):
+    # Vectorised `intern.target or 50`
+    targets = targets.fillna(0).to_numpy()
+    return np.where(targets == 0, DEFAULT_TARGET, targets).astype(int)
+
+
+def load_analytics_frames():
+    """Pull intern targets and per-intern, per-section metric sums into DataFrames.
+
+    Both frames come from one query each; the metric sums are read from the
+    daily rollup, so the second frame has at most one row per intern and section.
+    """
+    connection = db.session.connection()
+
+    interns = pd.read_sql(
+        db.session.query(
+            User.id.label('user_id'),
+            User.post,
+            User.target
+        ).filter(User.role == 'intern').statement,
+        connection
+    )
+
+    sums = pd.read_sql(
+        db.session.query(
+            PMSDailyRollup.user_id,
+            PMSDailyRollup.section,
+            *[func.coalesce(func.sum(getattr(PMSDailyRollup, metric)), 0).label(metric) for metric in POST_METRICS]
+        ).group_by(PMSDailyRollup.user_id, PMSDailyRollup.section).statement,
+        connection
+    )
+
+    return interns, sums
+
+
+def _plain(value):
+    # Missing posts/sections come back from pandas as NaN; templates expect None
+    return None if pd.isna(value) else value
+
+
+def analytics_series(interns, sums):
+    """Compute every per-intern, per-post and per-section series from the frames.
+
+    Returns plain Python dicts and lists so the result can go straight to a
+    template or through `tojson`.
+    """
+    interns = interns.assign(target=effective_targets(interns['target']))
+
+    # Per-intern totals across all sections
+    per_intern = sums.groupby('user_id')[POST_METRICS].sum()
+    interns = interns.join(per_intern, on='user_id')
+    interns[POST_METRICS] = interns[POST_METRICS].fillna(0).astype(int)
+
+    # Per-post totals, attributed through the intern's current post
+    by_post = interns.groupby('post', dropna=False, sort=False).agg(
+        interns=('user_id', 'count'),
+        target=('target', 'sum'),
+        **{metric: (metric, 'sum') for metric in POST_METRICS}
+    )
+
+    # Per-section totals over interns only
+    intern_sums = sums[sums['user_id'].isin(interns['user_id'])]
+    by_section = intern_sums.groupby('section', dropna=False, sort=False)[POST_METRICS].sum()
+
+    overall = {'interns': len(interns), 'target': int(interns['target'].sum())}
+    overall.update({metric: int(interns[metric].sum()) for metric in POST_METRICS})
+
+    return {
+        'posts': {_plain(post): {key: int(value) for key, value in row.items()}
+                  for post, row in by_post.iterrows()},
+        'sections': {_plain(section): {key: int(value) for key, value in row.items()}
+                     for section, row in by_section.iterrows()},
+        'interns': {int(row.user_id): {'target': int(row.target), **{metric: int(getattr(row, metric)) for metric in POST_METRICS}}
+                    for row in interns.itertuples(index=False)},
+        'overall': overall
+    }
+
+
+def post_series(series, posts):
+    # Chart-ready lists for the given posts, in order
+    return {
+        'labels': list(posts),
+        'targets': [series['posts'][post]['target'] for post in posts],
+        'achievements': [series['posts'][post]['total_enrollments'] for post in posts]
+    }
+
+
+def progress_percent(achieved, target):
+    return int((achieved / target * 100) if target > 0 else 0)
+
+
+def latest_entries_query():
+    # Each intern's newest entry, ranked with ROW_NUMBER() over their entries
+    ranked = db.session.query(
+        PMSEntry.id.label('id'),
+        func.row_number().over(
+            partition_by=PMSEntry.user_id,
+            order_by=(PMSEntry.date.desc(), PMSEntry.id.desc())
+        ).label('rank')
+    ).join(User, User.id == PMSEntry.user_id).filter(User.role == 'intern').subquery()
+
+    return PMSEntry.query.join(ranked, ranked.c.id == PMSEntry.id).filter(ranked.c.rank == 1)
+
+
+def latest_entries():
+    """Return the most recent entry of every intern as a dict of its columns, keyed by user id.
+
+    Uses ROW_NUMBER() over each intern's entries so exactly one row per intern
+    comes back from a single query.
+    """
+    entries = plain_rows(latest_entries_query().with_entities(*PMSEntry.__table__.columns))
+    return {entry['user_id']: entry for entry in entries}
+
+
+# Time-bucketed series
+
+# Rollup column holding the start of each bucket, per granularity
+BUCKET_COLUMNS = {
+    'day': PMSDailyRollup.day,
+    'week': PMSDailyRollup.week_start,
+    'month': PMSDailyRollup.month_start
+}
+
+# Metrics tracked per bucket for the trend and comparison charts
+TREND_METRICS = ['total_enrollments', 'daily_leads_generated', 'daily_leads_contacted',
+                 'daily_prospects', 'daily_suspects']
+
+# Radar chart axes and the metric behind each of them
+COMPARISON_METRICS = [
+    ('Leads', 'daily_leads_generated'),
+    ('Prospects', 'daily_prospects'),
+    ('Suspects', 'daily_suspects'),
+    ('Conversions', 'total_enrollments'),
+    ('Follow-ups', 'daily_leads_contacted')
+]
+
+# Totals of closed buckets are kept in the shared cache, under 'buckets:<granularity>:<start>'
+# and the database's data epoch. Entries are always written for today, so a bucket never
+# changes once its period is over; the bucket containing today is re-read on every call
+# instead of cached.
+BUCKET_KEY_PREFIX = 'buckets:'
+
+
+def _bucket_key(granularity, start):
+    return f'{BUCKET_KEY_PREFIX}{granularity}:{start.isoformat()}'
+
+
+def bucket_start(day, granularity):
+    if granularity == 'day':
+        return day
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+
+def bucket_starts(granularity, count, today=None):
+    # The last `count` bucket starts, oldest first, ending with the current bucket
+    current = bucket_start(today or date.today(), granularity)
+    if granularity == 'day':
+        starts = [current - timedelta(days=i) for i in range(count)]
+    elif granularity == 'week':
+        starts = [current - timedelta(weeks=i) for i in range(count)]
+    else:
+        starts = []
+        for i in range(count):
+            month_index = current.year * 12 + current.month - 1 - i
+            starts.append(date(month_index // 12, month_index % 12 + 1, 1))
+    return list(reversed(starts))
+
+
+def bucket_label(start, granularity):
+    if granularity == 'day':
+        return start.strftime('%a')
+    if granularity == 'week':
+        return f"W{start.isocalendar()[1]}"
+    return start.strftime('%b')
+
+
+def bucketed_totals(granularity, starts):
+    """Return {bucket start: {user_id: {metric: total}}} for the given buckets.
+
+    Buckets missing from the cache, plus the current one, are read with a
+    single grouped query over the daily rollup.
+    """
+    current = bucket_start(date.today(), granularity)
+    store = shared_cache()
+    epoch = data_epoch()
+    cached = {}
+    for start in starts:
+        if start != current and epoch is not None:
+            totals = store.get(_bucket_key(granularity, start), epoch)
+            if totals is not MISSING:
+                # Stored as JSON, so the user ids come back as strings
+                cached[start] = {int(user_id): metrics for user_id, metrics in totals.items()}
+    missing = [start for start in starts if start not in cached]
+
+    fresh = {start: {} for start in missing}
+    if missing:
+        column = BUCKET_COLUMNS[granularity]
+        rows = db.session.query(
+            column,
+            PMSDailyRollup.user_id,
+            *[func.coalesce(func.sum(getattr(PMSDailyRollup, metric)), 0) for metric in TREND_METRICS]
+        ).filter(column.in_(missing)).group_by(column, PMSDailyRollup.user_id).all()
+
+        for start, user_id, *sums in rows:
+            fresh[start][user_id] = dict(zip(TREND_METRICS, (int(value) for value in sums)))
+
+        for start, totals in fresh.items():
+            if start != current and epoch is not None:
+                store.set(_bucket_key(granularity, start), epoch, totals)
+
+    return {start: fresh[start] if start in fresh else cached[start] for start in starts}
+
+
+def invalidate_buckets(days=None):
+    # Forget cached buckets containing any of the given days (all of them when None), in every worker
+    store = shared_cache()
+    if days is None:
+        store.delete_prefix(BUCKET_KEY_PREFIX)
+        return
+    store.delete({_bucket_key(granularity, bucket_start(day, granularity))
+                  for day in days for granularity in BUCKET_COLUMNS})
+
+
+def time_series(granularity, count, intern_posts, metric='total_enrollments'):
+    """Per-intern and per-post series of `metric` over the last `count` buckets.
+
+    `intern_posts` maps intern ids to their post; only those interns are included.
+    """
+    starts = bucket_starts(granularity, count)
+    buckets = bucketed_totals(granularity, starts)
+
+    per_intern = {user_id: [0] * len(starts) for user_id in intern_posts}
+    per_post = {}
+    for post in intern_posts.values():
+        per_post.setdefault(post, [0] * len(starts))
+
+    for index, start in enumerate(starts):
+        for user_id, totals in buckets[start].items():
+            if user_id in intern_posts:
+                per_intern[user_id][index] += totals[metric]
+                per_post[intern_posts[user_id]][index] += totals[metric]
+
+    return {
+        'labels': [bucket_label(start, granularity) for start in starts],
+        'interns': per_intern,
+        'posts': per_post
+    }
+
+
+def comparison_series(intern_posts, posts):
+    """Current-month totals per post on the comparison axes, scaled 0-100.
+
+    Each axis is scaled against the best post on that axis.
+    """
+    current = bucket_start(date.today(), 'month')
+    totals = bucketed_totals('month', [current])[current]
+
+    raw = {post: [0] * len(COMPARISON_METRICS) for post in posts}
+    for user_id, metrics in totals.items():
+        post = intern_posts.get(user_id)
+        if post in raw:
+            for index, (_, metric) in enumerate(COMPARISON_METRICS):
+                raw[post][index] += metrics[metric]
+
+    best = [max([raw[post][index] for post in posts] or [0]) for index in range(len(COMPARISON_METRICS))]
+    return {
+        'labels': [label for label, _ in COMPARISON_METRICS],
+        'posts': {post: [progress_percent(value, best[index]) for index, value in enumerate(values)]
+                  for post, values in raw.items()}
+    }
@@ -1,11 +1,23 @@
-from flask import Flask, render_template, redirect, url_for, flash, request, session
+from flask import Flask, Request, render_template, redirect, url_for, flash, request, session
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash
 from datetime import datetime
-from models import db, User
+from tempfile import SpooledTemporaryFile
+from sqlite3 import Connection as SQLiteConnection
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from models import db
+from user_cache import cached_user
 import os
 
+class SpooledUploadRequest(Request):
+    # Buffer each upload in its own SpooledTemporaryFile, kept in memory up to
+    # UPLOAD_SPOOL_SIZE bytes (werkzeug spills to disk above 500 KB)
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return SpooledTemporaryFile(max_size=app.config['UPLOAD_SPOOL_SIZE'], mode='rb+')
+
 app = Flask(__name__)
+app.request_class = SpooledUploadRequest
 
 # Secret key for session and CSRF protection
 app.secret_key = os.environ.get("SECRET_KEY", "your_default_secret_key")
@@ -17,6 +29,19 @@ app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
 )
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Uploads up to this size never touch the disk
+app.config['UPLOAD_SPOOL_SIZE'] = int(os.environ.get('UPLOAD_SPOOL_SIZE', 16 * 1024 * 1024))
+
+# Cache file shared by this machine's workers (see shared_cache.py); keep it on local disk
+app.config['SHARED_CACHE_PATH'] = os.environ.get('SHARED_CACHE_PATH', os.path.join(app.instance_path, 'shared_cache.db'))
+
+# SQLite databases run in WAL mode, so pages and job polling can read while an
+# import holds the write lock
+@event.listens_for(Engine, 'connect')
+def set_sqlite_journal_mode(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, SQLiteConnection):
+        dbapi_connection.execute('PRAGMA journal_mode=WAL')
+
 # Initialize extensions
 db.init_app(app)
 
@@ -24,10 +49,10 @@ login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'admin_login'
 
-# Load user for login manager
+# Load user for login manager; a cached identity record rather than the full User row
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return cached_user(int(user_id))
 
 # Context processor to inject current time
 @app.context_processor
@@ -37,6 +62,13 @@ def inject_now():
 # Import routes (ensure routes.py uses @app.route decorators)
 from routes import *
 
+# Start this worker's background job runner (file imports) on its first request
+from jobs import job_runner
+
+@app.before_request
+def start_job_runner():
+    job_runner.start(app)
+
 # Optional package check (you can remove in production)
 def check_required_packages():
     try:
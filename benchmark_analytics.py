@@ -0,0 +1,133 @@
+import os
+import sys
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+from flask import Flask
+from models import db, User, PMSEntry
+from rollups import rebuild_rollups
+from analytics import load_analytics_frames, analytics_series, post_series
+
+# Compares the analytics chart series computed with the original per-intern
+# Python loops against the pandas implementation in analytics.py.
+#
+#   python benchmark_analytics.py [entries ...]   (default: 10000 100000 1000000)
+
+INTERN_COUNT = 300
+POSTS = ['Human Resources', 'Business Development', 'Sales & Marketing', 'Marketing']
+
+# Create a minimal Flask app on a scratch database
+db_file = os.path.join(tempfile.mkdtemp(), 'benchmark.db')
+app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_file}'
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SHARED_CACHE_PATH'] = os.path.join(os.path.dirname(db_file), 'shared_cache.db')
+db.init_app(app)
+
+def populate(entry_count):
+    db.drop_all()
+    db.create_all()
+    rnd = random.Random(42)
+
+    db.session.bulk_insert_mappings(User, [{
+        'id': i + 1,
+        'username': f'intern{i}',
+        'password_hash': '-',
+        'role': 'intern',
+        'name': f'Intern {i}',
+        'post': POSTS[i % len(POSTS)],
+        'target': rnd.choice([0, 30, 50, 80])
+    } for i in range(INTERN_COUNT)])
+
+    start_day = date.today() - timedelta(days=entry_count // INTERN_COUNT)
+    batch = []
+    for i in range(entry_count):
+        batch.append({
+            'user_id': i % INTERN_COUNT + 1,
+            'date': start_day + timedelta(days=i // INTERN_COUNT),
+            'section': POSTS[rnd.randrange(len(POSTS))],
+            'total_enrollments': rnd.randrange(10),
+            'school_lead_db': rnd.randrange(10),
+            'college_db': rnd.randrange(10),
+            'client_db': rnd.randrange(10)
+        })
+        if len(batch) == 50000:
+            db.session.execute(PMSEntry.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(PMSEntry.__table__.insert(), batch)
+
+    rebuild_rollups()
+    db.session.commit()
+
+def loop_series():
+    # The chart computations as admin_analytics() used to do them
+    interns = User.query.filter_by(role='intern').all()
+    posts = []
+    for intern in interns:
+        if intern.post and intern.post not in posts:
+            posts.append(intern.post)
+
+    team_achieved = {}
+    for post in posts:
+        post_interns = [i for i in interns if i.post == post]
+        post_entries = []
+        for intern in post_interns:
+            post_entries.extend(intern.pms_entries)
+        team_achieved[post] = sum(entry.total_enrollments for entry in post_entries)
+
+    total_enrollments = sum(entry.total_enrollments for intern in interns for entry in intern.pms_entries)
+    school_lead_db = sum(entry.school_lead_db for intern in interns for entry in intern.pms_entries)
+
+    section_targets = []
+    section_achievements = []
+    for post in posts:
+        post_interns = [i for i in interns if i.post == post]
+        section_targets.append(sum(intern.target or 50 for intern in post_interns))
+        section_achievements.append(sum(entry.total_enrollments for intern in post_interns
+                                        for entry in intern.pms_entries))
+
+    distribution_data = []
+    for post in posts:
+        distribution_data.append(sum(entry.total_enrollments for intern in interns if intern.post == post
+                                     for entry in intern.pms_entries))
+
+    return section_targets, section_achievements, distribution_data, total_enrollments, school_lead_db
+
+def pandas_series():
+    series = analytics_series(*load_analytics_frames())
+    posts = [post for post in series['posts'] if post]
+    chart = post_series(series, posts)
+    return (chart['targets'], chart['achievements'], list(chart['achievements']),
+            series['overall']['total_enrollments'], series['overall']['school_lead_db'])
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def run_benchmark(sizes):
+    with app.app_context():
+        print(f"{'entries':>10} {'loops (s)':>12} {'pandas (s)':>12} {'speedup':>9}")
+        for size in sizes:
+            populate(size)
+            repeat = 3 if size < 1000000 else 1
+            loop_time, loop_result = timed(loop_series, repeat)
+            pandas_time, pandas_result = timed(pandas_series, repeat)
+
+            if loop_result != pandas_result:
+                print(f"Results differ at {size} entries: {loop_result} != {pandas_result}")
+                return False
+
+            print(f"{size:>10} {loop_time:>12.3f} {pandas_time:>12.3f} {loop_time / pandas_time:>8.1f}x")
+    return True
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000]
+    sys.exit(0 if run_benchmark(sizes) else 1)
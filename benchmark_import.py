@@ -0,0 +1,121 @@
+import csv
+import os
+import sys
+import random
+import tempfile
+import time
+from datetime import datetime
+from flask import Flask
+from models import db, User, PMSEntry
+from sheets import METRIC_COLUMNS, iter_csv_rows
+from importer import import_rows
+
+# Times a monthly CSV upload (one row per intern) through the original
+# row-by-row ORM loop and through the bulk pipeline in importer.py. The
+# interns already exist, as they do for every sheet after the first.
+#
+#   python benchmark_import.py [rows ...]   (default: 10000)
+
+POSTS = ['Human Resources', 'Business Development', 'Sales & Marketing', 'Marketing']
+HEADERS = ['POC', 'Intern Name', 'Post', 'DOJ', 'Reference Number', 'Email Id'] + list(METRIC_COLUMNS)
+
+# Create a minimal Flask app on a scratch database
+work_dir = tempfile.mkdtemp()
+app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(work_dir, 'benchmark.db')}"
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+db.init_app(app)
+
+def write_sheet(row_count):
+    rnd = random.Random(7)
+    path = os.path.join(work_dir, f'sheet_{row_count}.csv')
+    with open(path, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(HEADERS)
+        for intern in range(row_count):
+            writer.writerow([f'Intern {intern % 10}', f'Intern {intern}', POSTS[intern % len(POSTS)], '2025-04-16',
+                             f'INT-{intern}', f'intern{intern}@example.com'] +
+                            [rnd.choice(['-', '0', '3', '12']) for _ in METRIC_COLUMNS])
+    return path
+
+def reset_database(intern_count):
+    db.drop_all()
+    db.create_all()
+    db.session.bulk_insert_mappings(User, [{
+        'username': f'intern{i}',
+        'password_hash': '-',
+        'role': 'intern',
+        'name': f'Intern {i}',
+        'post': POSTS[i % len(POSTS)]
+    } for i in range(intern_count)])
+    db.session.commit()
+
+def loop_import(path):
+    # The CSV branch of upload_data() as it used to be
+    def safe_int(value):
+        if not value or value == '-' or value == '':
+            return 0
+        try:
+            return int(value)
+        except (ValueError, TypeError):
+            return 0
+
+    with open(path, 'r', newline='', encoding='utf-8') as csvfile:
+        reader = csv.DictReader(csvfile)
+        for row in reader:
+            user = User.query.filter_by(name=row['Intern Name']).first()
+            entry = PMSEntry(
+                user_id=user.id,
+                date=datetime.now().date(),
+                poc=row['POC'] if row['POC'] else None,
+                intern_name=row['Intern Name'],
+                post=row['Post'] if row['Post'] else None,
+                doj=row['DOJ'] if row['DOJ'] else None,
+                reference_number=row['Reference Number'] if row['Reference Number'] else None,
+                email_id=row['Email Id'] if row['Email Id'] else None,
+                **{metric: safe_int(row[column]) for column, metric in METRIC_COLUMNS.items()}
+            )
+            db.session.add(entry)
+
+        poc_names = set()
+        csvfile.seek(0)
+        reader = csv.DictReader(csvfile)
+        for row in reader:
+            if row['POC']:
+                poc_names.add(row['POC'])
+        for poc_name in poc_names:
+            poc_user = User.query.filter_by(name=poc_name).first()
+            if poc_user:
+                poc_user.is_poc = True
+
+    db.session.commit()
+
+def bulk_import(path):
+    import_rows(iter_csv_rows(path))
+    db.session.commit()
+
+def timed(fn, path, intern_count):
+    reset_database(intern_count)
+    start = time.perf_counter()
+    fn(path)
+    elapsed = time.perf_counter() - start
+    return elapsed, PMSEntry.query.count()
+
+def run_benchmark(sizes):
+    with app.app_context():
+        print(f"{'rows':>8} {'loop (s)':>10} {'bulk (s)':>10} {'speedup':>9}")
+        for size in sizes:
+            path = write_sheet(size)
+            loop_time, loop_count = timed(loop_import, path, size)
+            bulk_time, bulk_count = timed(bulk_import, path, size)
+
+            if loop_count != bulk_count:
+                print(f"Row counts differ at {size} rows: {loop_count} != {bulk_count}")
+                return False
+
+            print(f"{size:>8} {loop_time:>10.2f} {bulk_time:>10.2f} {loop_time / bulk_time:>8.1f}x")
+    return True
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000]
+    sys.exit(0 if run_benchmark(sizes) else 1)
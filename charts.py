@@ -0,0 +1,43 @@
+import hashlib
+from datetime import date
+from flask import current_app, jsonify, request
+from sqlalchemy import func
+from models import db, PMSEntry
+
+# Chart data is served as JSON next to the pages that draw it, with an ETag so a
+# browser refreshing a page gets 304 Not Modified for every chart that has not
+# changed. Cache-Control: no-cache makes browsers ask again on each load.
+
+
+def chart_etag(name, *parts):
+    # Strong ETag for chart `name`, from today's date (series end today) and `parts`
+    key = '|'.join(str(part) for part in (name, date.today()) + parts)
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def entries_stamp_query(filters):
+    # Newest updated_at and number of the PMS entries matching `filters`; keep
+    # `filters` on an indexed column, as this runs on every chart request
+    return db.session.query(func.max(PMSEntry.updated_at), func.count(PMSEntry.id)).filter(*filters)
+
+
+def entries_etag(name, filters, *extra):
+    """Strong ETag for chart `name` over the PMS entries matching `filters`.
+
+    Taken from the newest updated_at and the number of entries in scope (so
+    deleted entries count as a change too), and `extra`, for anything else
+    the chart is built from.
+    """
+    latest, count = entries_stamp_query(filters).one()
+    return chart_etag(name, latest, count, *extra)
+
+
+def chart_response(etag, build):
+    # 304 when the client already has `etag`, otherwise build() as JSON
+    if etag in request.if_none_match:
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,110 @@
+import os
+import sys
+import tempfile
+from sqlalchemy import event
+
+# Checks that write routes issue a fixed number of SQL statements however many
+# interns they touch. Exits non-zero if a route's statement count grows with the
+# intern count.
+#
+#   python check_query_counts.py
+#
+# The routes are served by app.py's app, which is pointed at a scratch SQLite
+# database first: the check drops every table, and app.py otherwise falls back
+# to the production database.
+work_dir = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(work_dir, 'count_check.db')}"
+os.environ['SHARED_CACHE_PATH'] = os.path.join(work_dir, 'shared_cache.db')
+
+from app import app, db
+from models import User, PMSEntry, PMSDailyRollup
+
+INTERN_COUNTS = [5, 200]
+
+METRICS = ['total_enrollments', 'ms_azure_900', 'seo_starter', 'seo_smm', 'dm_crash', 'job_ready',
+           'azure_combo', 'recruitment', 'college_db', 'client_db', 'school_lead_db']
+
+def reset_database(intern_count):
+    db.drop_all()
+    db.create_all()
+    admin = User(username='admin', role='admin', name='Admin')
+    admin.set_password('admin123')
+    db.session.add(admin)
+    db.session.bulk_insert_mappings(User, [{
+        'username': f'intern{i}',
+        'password_hash': '-',
+        'role': 'intern',
+        'name': f'Intern {i}',
+        'poc_name': 'Intern 0'
+    } for i in range(intern_count)])
+    db.session.commit()
+    return admin.id
+
+def intern_numbers_form(value):
+    # Every intern's inputs on /admin/manage_intern_numbers, all set to `value`
+    intern_ids = [user_id for user_id, in db.session.query(User.id).filter_by(role='intern')]
+    return {f'{metric}_{user_id}': str(value) for user_id in intern_ids for metric in METRICS}
+
+def count_statements(client, url, data=None):
+    # Requests are made outside any app context, so each one gets its own session
+    with app.app_context():
+        engine = db.engine
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = client.post(url, data=data) if data is not None else client.get(url)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    if response.status_code != 302 or response.location.endswith('/admin'):
+        raise RuntimeError(f"{url} answered {response.status_code} {response.location or ''}")
+    return len(statements)
+
+def route_counts(intern_count):
+    # Statements for a first save of intern numbers (all entries inserted), a second
+    # one (all updated), and for re-targeting every intern
+    with app.app_context():
+        admin_id = reset_database(intern_count)
+        forms = {'insert': intern_numbers_form(3), 'update': intern_numbers_form(4)}
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(admin_id)
+        session['_fresh'] = True
+
+    counts = {f'save_intern_numbers ({step})': count_statements(client, '/admin/save_intern_numbers', form)
+              for step, form in forms.items()}
+    counts['update_all_targets'] = count_statements(client, '/admin/update_all_targets')
+
+    with app.app_context():
+        entries = PMSEntry.query.count()
+        total = db.session.query(db.func.sum(PMSDailyRollup.total_enrollments)).scalar()
+    if entries != intern_count or total != 4 * intern_count:
+        raise RuntimeError(f"Expected {intern_count} entries summing to {4 * intern_count}, "
+                           f"found {entries} summing to {total}")
+    return counts
+
+def check_query_counts():
+    app.config['TESTING'] = True
+    results = {size: route_counts(size) for size in INTERN_COUNTS}
+
+    ok = True
+    for route in results[INTERN_COUNTS[0]]:
+        counts = [results[size][route] for size in INTERN_COUNTS]
+        same = len(set(counts)) == 1
+        ok = ok and same
+        detail = ', '.join(f"{size} interns: {count}" for size, count in zip(INTERN_COUNTS, counts))
+        print(f"{'ok' if same else 'GROWS':<10} {route} - {detail}")
+
+    if not ok:
+        print("Statement counts grow with the number of interns.")
+        return False
+
+    print("Statement counts are independent of the number of interns.")
+    return True
+
+if __name__ == '__main__':
+    sys.exit(0 if check_query_counts() else 1)
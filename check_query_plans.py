@@ -0,0 +1,94 @@
+import sys
+from datetime import date
+from sqlalchemy import text
+from app import app, db
+from models import PMSEntry
+from analytics import latest_entries_query
+from entries import day_entries, section_entry, admin_numbers
+from reports import filtered_entries, page_query, DEFAULT_PAGE_SIZE
+from kpis import kpi_query
+from charts import entries_stamp_query
+from routes import INTERN_NUMBER_FIELDS
+
+# Run against a scratch database to check the model's declared indexes, e.g.
+#   DATABASE_URL=sqlite:///plan_check.db python check_query_plans.py
+# Exits non-zero if any route query falls back to a full scan of pms_entry or
+# pms_daily_rollup.
+
+def route_queries():
+    # The PMSEntry and rollup lookups issued by the routes, built by the same helpers
+    # with representative filter values
+    today = date.today()
+    month_start = today.isoformat()[:8] + '01'
+    month = {'start_date': month_start, 'end_date': today.isoformat()}
+    return {
+        'update_pms': section_entry(1, today, 'Marketing'),
+        'intern_dashboard': day_entries(today, 1),
+        'save_intern_numbers': admin_numbers(today, INTERN_NUMBER_FIELDS),
+        'admin_dashboard': day_entries(today),
+        'admin_analytics (latest entries)': latest_entries_query(),
+        'admin_reports': page_query(filtered_entries(month), DEFAULT_PAGE_SIZE),
+        'admin_reports (intern)': page_query(filtered_entries(dict(month, user_id=1)), DEFAULT_PAGE_SIZE),
+        'admin_reports (section)': page_query(filtered_entries(dict(month, section='Marketing')), DEFAULT_PAGE_SIZE),
+        'admin_reports (next page)': page_query(filtered_entries({}), DEFAULT_PAGE_SIZE,
+                                                after=(today, 1000)),
+        'admin_reports (previous page)': page_query(filtered_entries({}), DEFAULT_PAGE_SIZE,
+                                                    before=(today, 1000)),
+        'intern_history': filtered_entries(dict(month, user_id=1)).order_by(PMSEntry.date.desc()),
+        'view_intern': filtered_entries({'user_id': 1}).order_by(PMSEntry.date.desc()),
+        'intern_kpis': kpi_query(1, date.fromisoformat(month_start)),
+        'intern_chart (etag)': entries_stamp_query([PMSEntry.user_id == 1]),
+    }
+
+def explain(query):
+    compiled = query.statement.compile()
+    dialect = db.engine.dialect.name
+
+    if dialect == 'sqlite':
+        rows = db.session.execute(text('EXPLAIN QUERY PLAN ' + str(compiled)), compiled.params).all()
+        return [row[-1] for row in rows]
+
+    if dialect == 'postgresql':
+        # Small tables are always cheapest to scan sequentially; take that option away
+        # so the plan shows whether an index can serve the query at all
+        db.session.execute(text('SET LOCAL enable_seqscan = off'))
+        rows = db.session.execute(text('EXPLAIN ' + str(compiled)), compiled.params).all()
+        return [row[0] for row in rows]
+
+    raise ValueError(f"Query plan check is not supported for {dialect}")
+
+# Tables a route query must never scan in full
+CHECKED_TABLES = ['pms_entry', 'pms_daily_rollup']
+
+def is_full_scan(plan_line):
+    line = plan_line.strip()
+    if db.engine.dialect.name == 'sqlite':
+        return any(line.startswith(f'SCAN {table}') and 'USING' not in line for table in CHECKED_TABLES)
+    return any(f'Seq Scan on {table}' in line for table in CHECKED_TABLES)
+
+def check_query_plans():
+    with app.app_context():
+        db.create_all()
+
+        failures = []
+        for name, query in route_queries().items():
+            plan = explain(query)
+            db.session.rollback()
+
+            if any(is_full_scan(line) for line in plan):
+                failures.append(name)
+                print(f"FULL SCAN  {name}")
+            else:
+                print(f"ok         {name}")
+            for line in plan:
+                print(f"           {line}")
+
+        if failures:
+            print(f"{len(failures)} route queries scan a table without an index: {', '.join(failures)}")
+            return False
+
+        print("All route queries use an index.")
+        return True
+
+if __name__ == '__main__':
+    sys.exit(0 if check_query_plans() else 1)
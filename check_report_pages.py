@@ -0,0 +1,121 @@
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+
+# Checks /admin/reports pagination: walks every page by cursor, and checks that
+# malformed cursors and page sizes give the first page rather than an error.
+# Exits non-zero on any failure.
+#
+#   python check_report_pages.py
+#
+# The routes are served by app.py's app, which is pointed at a scratch SQLite
+# database first: the check drops every table, and app.py otherwise falls back
+# to the production database.
+work_dir = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(work_dir, 'report_check.db')}"
+os.environ['SHARED_CACHE_PATH'] = os.path.join(work_dir, 'shared_cache.db')
+
+from app import app, db
+from models import User, PMSEntry
+from reports import report_page, filtered_entries
+
+ENTRY_COUNT = 23
+PAGE_SIZE = 5
+
+# ?after= / ?before= values that must fall back to the first page
+MALFORMED_CURSORS = ['garbage', '2024-01-01', '2024-01-01_1_2', '2024-13-01_5', '2024-01-01_x', '_',
+                     '2024-01-01_99999999999999999999']
+
+# ?per_page= values below 1, which must give pages of one entry
+SMALL_PAGE_SIZES = ['-5', '-1']
+
+def reset_database():
+    db.drop_all()
+    db.create_all()
+    admin = User(username='admin', role='admin', name='Admin')
+    admin.set_password('admin123')
+    intern = User(username='intern0', password_hash='-', role='intern', name='Intern 0')
+    db.session.add_all([admin, intern])
+    db.session.flush()
+    db.session.bulk_insert_mappings(PMSEntry, [{
+        'user_id': intern.id,
+        'date': date.today() - timedelta(days=i // 2),
+        'section': 'Marketing' if i % 2 else 'Human Resources'
+    } for i in range(ENTRY_COUNT)])
+    db.session.commit()
+    return admin.id
+
+def get(client, query):
+    response = client.get(f'/admin/reports?per_page={PAGE_SIZE}{query}')
+    if response.status_code != 200:
+        raise RuntimeError(f"/admin/reports?{query} answered {response.status_code}")
+    return response
+
+def check_report_pages():
+    app.config['TESTING'] = True
+    with app.app_context():
+        admin_id = reset_database()
+        expected = [entry_id for entry_id, in db.session.query(PMSEntry.id)
+                    .order_by(PMSEntry.date.desc(), PMSEntry.id.desc())]
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(admin_id)
+        session['_fresh'] = True
+
+    ok = True
+
+    # Walk the older pages; report_page() is called directly for the cursors, and
+    # requests are made outside any app context, so each one gets its own session
+    seen = []
+    after = None
+    pages = []
+    while True:
+        with app.app_context():
+            entries, older, newer = report_page(filtered_entries({}), PAGE_SIZE, after=after)
+            seen.extend(entry.id for entry in entries)
+        get(client, f'&after={after}' if after else '')
+        pages.append((after, newer))
+        if older is None:
+            break
+        after = older
+    walked = seen == expected
+    ok = ok and walked
+    print(f"{'ok' if walked else 'FAIL':<10} older pages cover all {len(expected)} entries once, in order")
+
+    # The page newer than the second one is the first one
+    with app.app_context():
+        first, _, _ = report_page(filtered_entries({}), PAGE_SIZE)
+        back, _, _ = report_page(filtered_entries({}), PAGE_SIZE, before=pages[1][1])
+        same = [entry.id for entry in back] == [entry.id for entry in first]
+    ok = ok and same
+    print(f"{'ok' if same else 'FAIL':<10} newer page from page 2 is page 1")
+
+    first_page = get(client, '').data
+    for cursor in MALFORMED_CURSORS:
+        for direction in ('after', 'before'):
+            try:
+                fallback = get(client, f'&{direction}={cursor}').data == first_page
+            except Exception as e:
+                print(f"{type(e).__name__}: {e}")
+                fallback = False
+            ok = ok and fallback
+            print(f"{'ok' if fallback else 'FAIL':<10} ?{direction}={cursor} gives the first page")
+
+    single = client.get('/admin/reports?per_page=1').data
+    for size in SMALL_PAGE_SIZES:
+        response = client.get(f'/admin/reports?per_page={size}')
+        clamped = response.status_code == 200 and response.data == single
+        ok = ok and clamped
+        print(f"{'ok' if clamped else 'FAIL':<10} ?per_page={size} gives pages of one entry")
+
+    if not ok:
+        print("Report pagination is broken.")
+        return False
+
+    print("Report pagination works.")
+    return True
+
+if __name__ == '__main__':
+    sys.exit(0 if check_report_pages() else 1)
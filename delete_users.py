@@ -1,5 +1,7 @@
 from app import app, db
 from models import User
+from user_cache import forget_users
+from view_cache import bump_data_version
 
 def delete_interns():
     with app.app_context():
@@ -9,6 +11,8 @@ def delete_interns():
             db.session.delete(intern)
         
         db.session.commit()
+        forget_users()
+        bump_data_version()
         print(f"Deleted {len(interns)} intern users")
 
 if __name__ == "__main__":
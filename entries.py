@@ -0,0 +1,52 @@
+from datetime import datetime
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, PMSEntry, PMS_ENTRY_KEY
+
+# INSERT constructs that support ON CONFLICT, by dialect
+UPSERT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert
+}
+
+
+# Entry lookups shared by the routes and check_query_plans.py
+
+def day_entries(day, user_id=None):
+    # Entries of one day, for one intern or for everyone
+    query = PMSEntry.query.filter(PMSEntry.date == day)
+    if user_id is not None:
+        query = query.filter(PMSEntry.user_id == user_id)
+    return query
+
+
+def section_entry(user_id, day, section):
+    # An intern's entry for one day and section
+    return PMSEntry.query.filter_by(user_id=user_id, date=day, section=section)
+
+
+def admin_numbers(day, fields):
+    # (user_id, *fields) of the day's entries without a section, i.e. admin-entered numbers
+    return db.session.query(PMSEntry.user_id, *[getattr(PMSEntry, field) for field in fields]) \
+        .filter(PMSEntry.date == day, PMSEntry.section.is_(None))
+
+
+def upsert_entries(rows, update_fields):
+    """Insert PMS entries, or update `update_fields` of the entry already holding the same key.
+
+    Entries are keyed on (user_id, date, section) by the uq_pms_entry_key
+    index. All rows go out as one executemany INSERT ... ON CONFLICT DO
+    UPDATE statement, so every row must have the same keys. Runs in the
+    caller's session; the caller commits.
+    """
+    if not rows:
+        return
+
+    dialect = db.engine.dialect.name
+    if dialect not in UPSERT_INSERTS:
+        raise ValueError(f"Entry upserts are not supported for {dialect}")
+
+    statement = UPSERT_INSERTS[dialect](PMSEntry.__table__)
+    updates = {field: statement.excluded[field] for field in update_fields}
+    updates['updated_at'] = datetime.utcnow()
+    statement = statement.on_conflict_do_update(index_elements=PMS_ENTRY_KEY, set_=updates)
+    db.session.execute(statement, rows)
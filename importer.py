@@ -0,0 +1,221 @@
+import queue
+import threading
+from datetime import date
+from models import db, User, PMSEntry, DEFERRED_PASSWORD, in_chunks
+from rollups import refresh_rollups
+from entries import upsert_entries
+from sheets import METRIC_COLUMNS, normalized_chunks, upload_chunks
+
+# Parsed chunks allowed to wait for the database
+PREFETCH_DEPTH = 2
+
+# Entry fields written by an import; an entry is only updated when one of them changes
+IMPORT_FIELDS = ['poc', 'intern_name', 'post', 'doj', 'reference_number', 'email_id'] + list(METRIC_COLUMNS.values())
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+
+def prefetch(iterable, depth=PREFETCH_DEPTH):
+    """Iterate `iterable` on a helper thread, staying at most `depth` items ahead.
+
+    Lets the next chunk be parsed while the current one is written to the
+    database. Errors raised while producing are re-raised to the consumer.
+    """
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        # Give up if the consumer has gone away
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except Exception as e:
+            put(_Failure(e))
+        else:
+            put(done)
+
+    producer = threading.Thread(target=produce, name='import-parser', daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is done:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        producer.join()
+
+
+def _username_for(row):
+    email = row['email_id']
+    return email.split('@')[0] if email else row['intern_name'].lower().replace(' ', '.')
+
+
+def resolve_users(rows, user_ids=None):
+    """Map every intern name in `rows` to a user id, creating missing interns in one batch.
+
+    `user_ids` carries names already resolved by earlier chunks of the same import
+    and is updated in place. Returns (user ids by name, number of interns created).
+    """
+    user_ids = {} if user_ids is None else user_ids
+    names = {row['intern_name'] for row in rows} - user_ids.keys()
+    for chunk in in_chunks(names):
+        user_ids.update(db.session.query(User.name, User.id).filter(User.name.in_(chunk)).all())
+
+    # First row of each unseen intern supplies their profile
+    new_users = {}
+    for row in rows:
+        name = row['intern_name']
+        if name not in user_ids and name not in new_users:
+            new_users[name] = {
+                'username': _username_for(row),
+                # Hashed on first login rather than once per new intern here
+                'password_hash': DEFERRED_PASSWORD,
+                'name': name,
+                'email': row['email_id'],
+                'role': 'intern',
+                'post': row['post'],
+                'doj': row['doj'],
+                'reference_number': row['reference_number'],
+                'poc_name': row['poc'],
+                'is_poc': False
+            }
+
+    if new_users:
+        db.session.bulk_insert_mappings(User, list(new_users.values()))
+        for chunk in in_chunks(new_users):
+            user_ids.update(db.session.query(User.name, User.id).filter(User.name.in_(chunk)).all())
+
+    return user_ids, len(new_users)
+
+
+def mark_pocs(poc_names):
+    # Flag every named POC in a single UPDATE per chunk, skipping those already flagged
+    for chunk in in_chunks(set(poc_names)):
+        User.query.filter(User.name.in_(chunk), User.is_poc.isnot(True)) \
+            .update({'is_poc': True}, synchronize_session=False)
+
+
+def write_entries(rows, entry_date):
+    """Write rows as the imported entries of `entry_date`, keyed on (user, date, section).
+
+    Imported rows have no section, and the last row for an intern wins; the
+    earlier ones count as repeated. Entries that already hold the same values
+    are left alone; the rest are inserted or updated by one INSERT ... ON
+    CONFLICT statement. Returns (inserted, updated, unchanged, repeated,
+    ids of interns whose entries changed).
+    """
+    latest = {row['user_id']: row for row in rows}
+
+    existing = {}
+    for chunk in in_chunks(latest):
+        query = db.session.query(PMSEntry.user_id, *[getattr(PMSEntry, field) for field in IMPORT_FIELDS]) \
+            .filter(PMSEntry.date == entry_date, PMSEntry.section.is_(None), PMSEntry.user_id.in_(chunk))
+        for user_id, *values in query:
+            existing[user_id] = values
+
+    writes = []
+    inserted = 0
+    for user_id, row in latest.items():
+        if user_id not in existing:
+            inserted += 1
+        elif existing[user_id] == [row[field] for field in IMPORT_FIELDS]:
+            continue
+        row['section'] = None
+        writes.append(row)
+
+    upsert_entries(writes, IMPORT_FIELDS)
+
+    updated = len(writes) - inserted
+    return inserted, updated, len(latest) - len(writes), len(rows) - len(latest), {row['user_id'] for row in writes}
+
+
+def _resolve_stage(chunks, entry_date, counts):
+    # Pipeline stage: attach each row's user id (creating new interns) and entry date
+    user_ids = {}
+    for rows, skipped in chunks:
+        user_ids, created = resolve_users(rows, user_ids)
+        counts['users_created'] += created
+        for row in rows:
+            row['user_id'] = user_ids[row['intern_name']]
+            row['date'] = entry_date
+        yield rows, skipped
+
+
+def _collect_pocs_stage(chunks, poc_names):
+    # Pipeline stage: remember the POCs named by rows passing through
+    for rows, skipped in chunks:
+        poc_names.update(row['poc'] for row in rows if row['poc'])
+        yield rows, skipped
+
+
+def import_chunks(chunks, entry_date=None, progress=None):
+    """Import normalized (rows, skipped) chunks as the PMS entries of `entry_date` (today by default).
+
+    The upload goes through one pass of generator stages: parse and normalize
+    (on a helper thread, see prefetch), resolve users, collect POCs, then
+    write. A large upload is never held in memory at once. Rows are upserted
+    (see write_entries), so re-importing a corrected sheet only writes what
+    changed, and the POCs are flagged together at the end.
+
+    Everything runs in the caller's session and transaction; the caller
+    commits. `progress(parsed, inserted, updated, skipped)` is called after
+    each chunk. Returns import counts and the labels of rows skipped for
+    having no intern name.
+    """
+    entry_date = entry_date or date.today()
+    counts = {'rows': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0, 'repeated': 0, 'users_created': 0}
+    parsed = 0
+    skipped = []
+    poc_names = set()
+    changed_users = set()
+
+    stages = _collect_pocs_stage(_resolve_stage(prefetch(chunks), entry_date, counts), poc_names)
+    for rows, chunk_skipped in stages:
+        parsed += len(rows) + len(chunk_skipped)
+        skipped.extend(chunk_skipped)
+
+        inserted, updated, unchanged, repeated, users = write_entries(rows, entry_date)
+        counts['rows'] += len(rows)
+        counts['inserted'] += inserted
+        counts['updated'] += updated
+        counts['unchanged'] += unchanged
+        counts['repeated'] += repeated
+        changed_users.update(users)
+
+        if progress:
+            progress(parsed, counts['inserted'], counts['updated'], len(skipped))
+
+    mark_pocs(poc_names)
+
+    # Keep the daily rollup in step with the entries that changed
+    counts['days'] = refresh_rollups({(user_id, entry_date) for user_id in changed_users})
+
+    counts['skipped'] = skipped
+    return counts
+
+
+def import_rows(raw_rows, entry_date=None, progress=None):
+    # Import raw upload rows (dicts keyed by column header); see import_chunks()
+    return import_chunks(normalized_chunks(raw_rows), entry_date, progress)
+
+
+def import_upload(filename, data, entry_date=None, progress=None):
+    # Import every importable sheet of an uploaded .xlsx or .csv file; see import_chunks()
+    return import_chunks(upload_chunks(filename, data), entry_date, progress)
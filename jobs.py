@@ -0,0 +1,297 @@
+import hashlib
+import json
+import threading
+import time
+import traceback
+from datetime import datetime
+from models import db, BackgroundJob
+from importer import import_upload
+from purge import purge_data, describe_scope
+from user_cache import forget_users
+from view_cache import bump_data_version
+from analytics import invalidate_buckets
+from shared_cache import shared_cache, MISSING
+
+# Seconds between checks for jobs queued by other worker processes
+POLL_INTERVAL = 2
+
+# Skipped rows listed individually in a job's log before it just gives a count
+MAX_LOGGED_ROWS = 100
+
+# Seconds between heartbeats of a running job
+HEARTBEAT_INTERVAL = 10
+
+# Seconds without a heartbeat after which a running job's worker is taken to be gone
+STALE_JOB_AFTER = 60
+
+STALE_JOB_ERROR = 'The worker running this job stopped before it finished'
+
+
+def _progress_key(job_id):
+    return f'job:{job_id}'
+
+
+def _heartbeat_key(job_id):
+    return f'job-heartbeat:{job_id}'
+
+
+def report_progress(job_id, **counts):
+    """Publish a running job's counters to job_progress() in every worker.
+
+    The import stays uncommitted until the job finishes, and on SQLite its
+    transaction holds the only write lock meanwhile, so the counters go to
+    the shared cache rather than the job row.
+    """
+    shared_cache().set(_progress_key(job_id), 0, counts)
+
+
+def job_progress(job):
+    # job.to_dict(), with the latest counters published while it runs
+    data = job.to_dict()
+    if job.status == 'running':
+        counts = shared_cache().peek(_progress_key(job.id))
+        if counts is not MISSING:
+            data.update(counts)
+    return data
+
+
+def run_import_job(job):
+    # Stream an uploaded sheet into the database; the job row is left untouched
+    # until the import is done, and progress goes out through report_progress()
+    job_id = job.id
+
+    def progress(parsed, inserted, updated, failed):
+        report_progress(job_id, rows_parsed=parsed, rows_inserted=inserted, rows_updated=updated, rows_failed=failed)
+
+    result = import_upload(job.filename, job.payload, progress=progress)
+
+    job.rows_parsed = result['rows'] + len(result['skipped'])
+    job.rows_inserted = result['inserted']
+    job.rows_updated = result['updated']
+    job.rows_failed = len(result['skipped'])
+    job.add_log(f"Read {job.rows_parsed} rows from {job.filename}")
+    for row in result['skipped'][:MAX_LOGGED_ROWS]:
+        job.add_log(f"{row}: no intern name, skipped")
+    if len(result['skipped']) > MAX_LOGGED_ROWS:
+        job.add_log(f"... and {len(result['skipped']) - MAX_LOGGED_ROWS} more rows without an intern name")
+    job.add_log(f"Created {result['users_created']} interns")
+    job.add_log(f"Imported {result['rows']} records: {result['inserted']} new, "
+                f"{result['updated']} updated, {result['unchanged']} unchanged")
+    if result['repeated']:
+        job.add_log(f"{result['repeated']} rows repeated an intern listed later in the sheet, "
+                    f"whose last row was imported")
+    return result['days']
+
+
+def run_purge_job(job):
+    # Delete entries in committed chunks; the job row's progress goes out with each chunk
+    scope = json.loads(job.params or '{}')
+    job.add_log(f"Deleting {describe_scope(scope)}")
+
+    def progress(deleted, total):
+        job.rows_parsed = total
+        job.rows_deleted = deleted
+
+    result = purge_data(scope, progress=progress)
+    forget_uploads()
+
+    job.add_log(f"Deleted {result['entries']} entries, {result['rollups']} rollup rows "
+                f"and {result['interns']} interns")
+    return None
+
+
+# Job kind -> function(job) that does the work in the session; run_job() commits.
+# Purges commit as they go so that no transaction holds a whole table. Handlers
+# return the days whose rollups changed, or None when any day may have.
+JOB_HANDLERS = {
+    'import': run_import_job,
+    'purge': run_purge_job
+}
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def find_duplicate_upload(data_hash):
+    # The latest import job of an identical file that is pending or done, if any;
+    # jobs left behind by a stopped worker have failed and do not count
+    fail_stale_jobs()
+    return BackgroundJob.query.filter(
+        BackgroundJob.kind == 'import',
+        BackgroundJob.content_hash == data_hash,
+        BackgroundJob.status.in_(['queued', 'running', 'done'])
+    ).order_by(BackgroundJob.id.desc()).first()
+
+
+def forget_uploads():
+    """Drop the fingerprints of earlier uploads, so identical files import again.
+
+    Call whenever imported entries are deleted; the caller commits.
+    """
+    BackgroundJob.query.filter(BackgroundJob.content_hash.isnot(None)) \
+        .update({'content_hash': None}, synchronize_session=False)
+
+
+def enqueue_job(kind, created_by=None, filename=None, payload=None, data_hash=None, params=None):
+    # Store the job and wake this process's runner; returns the committed job
+    job = BackgroundJob(kind=kind, created_by=created_by, filename=filename, payload=payload,
+                        content_hash=data_hash, params=json.dumps(params) if params is not None else None, log='')
+    db.session.add(job)
+    db.session.commit()
+    job_runner.wake()
+    return job
+
+
+def heartbeat(store, job_id, stop):
+    # Beat for a running job in the shared cache until `stop` is set; see fail_stale_jobs()
+    while True:
+        store.set(_heartbeat_key(job_id), 0, time.time())
+        if stop.wait(HEARTBEAT_INTERVAL):
+            break
+    store.delete([_heartbeat_key(job_id)])
+
+
+def fail_stale_jobs():
+    """Fail running jobs whose worker was killed, timed out or restarted mid-job.
+
+    A job is stale once its last heartbeat, or its start before the first
+    one, is more than STALE_JOB_AFTER seconds old. Work it committed (purge
+    chunks) stays, so caches are invalidated as after any job. Imports are
+    not retried: the upload can simply be sent again.
+    """
+    store = shared_cache()
+    now = datetime.utcnow()
+    stale = []
+    for job_id, started_at in db.session.query(BackgroundJob.id, BackgroundJob.started_at).filter_by(status='running'):
+        beat = store.peek(_heartbeat_key(job_id), default=None)
+        idle = time.time() - beat if beat is not None else (now - (started_at or now)).total_seconds()
+        if idle > STALE_JOB_AFTER:
+            stale.append(job_id)
+    if not stale:
+        return 0
+
+    failed = 0
+    for job_id in stale:
+        # Conditional, so only one worker fails each job
+        if BackgroundJob.query.filter_by(id=job_id, status='running').update(
+                {'status': 'failed', 'error': STALE_JOB_ERROR, 'payload': None, 'finished_at': now},
+                synchronize_session=False):
+            db.session.get(BackgroundJob, job_id).add_log(f"Failed: {STALE_JOB_ERROR}")
+            failed += 1
+        db.session.commit()
+        store.delete([_progress_key(job_id), _heartbeat_key(job_id)])
+
+    if failed:
+        invalidate_buckets()
+        forget_users()
+        bump_data_version()
+    return failed
+
+
+def claim_next_job():
+    """Mark the oldest queued job as running and return it, or None if the queue is empty.
+
+    Every worker process polls the same table, so the claim is a conditional
+    UPDATE; only the process whose UPDATE matched the row runs the job. Jobs
+    of stopped workers are failed first (see fail_stale_jobs).
+    """
+    fail_stale_jobs()
+    while True:
+        job_id = db.session.query(BackgroundJob.id).filter_by(status='queued') \
+            .order_by(BackgroundJob.id).limit(1).scalar()
+        if job_id is None:
+            db.session.rollback()
+            return None
+
+        claimed = BackgroundJob.query.filter_by(id=job_id, status='queued').update(
+            {'status': 'running', 'started_at': datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+        if claimed:
+            return db.session.get(BackgroundJob, job_id)
+
+
+def run_job(job):
+    # Run a claimed job; its work and its final status are committed together
+    job_id = job.id
+    # A failed purge may have committed some of its chunks already
+    days = None
+    try:
+        handler = JOB_HANDLERS.get(job.kind)
+        if handler is None:
+            raise ValueError(f"Unknown job kind '{job.kind}'")
+        days = handler(job)
+        job.status = 'done'
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(BackgroundJob, job_id)
+        job.status = 'failed'
+        job.error = str(e)
+        job.rows_inserted = 0
+        job.rows_updated = 0
+        job.rows_failed = job.rows_parsed
+        job.add_log(f"Failed: {str(e)}")
+        job.add_log(traceback.format_exc())
+
+    job.payload = None
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+    shared_cache().delete([_progress_key(job_id)])
+
+    # Imports create and flag interns, purges delete them
+    invalidate_buckets(days)
+    forget_users()
+    bump_data_version()
+    return job
+
+
+class JobRunner:
+    """Daemon thread that works through the job table in this process.
+
+    Each gunicorn worker runs one, started on its first request. enqueue_job()
+    wakes the local runner straight away; jobs queued elsewhere are picked up
+    on the next poll. A job beats while it runs (see heartbeat), so the other
+    workers can tell when this one has died with it.
+    """
+
+    def __init__(self, poll_interval=POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, app):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, args=(app,), name='job-runner', daemon=True)
+                self._thread.start()
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self, app):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                with app.app_context():
+                    while True:
+                        job = claim_next_job()
+                        if job is None:
+                            break
+                        stop = threading.Event()
+                        beat = threading.Thread(target=heartbeat, args=(shared_cache(), job.id, stop),
+                                                name='job-heartbeat', daemon=True)
+                        beat.start()
+                        try:
+                            run_job(job)
+                        finally:
+                            stop.set()
+                            beat.join()
+            except Exception:
+                app.logger.exception('Background job runner failed')
+
+
+job_runner = JobRunner()
@@ -0,0 +1,79 @@
+from sqlalchemy import func
+from models import db, User, PMSDailyRollup
+from analytics import DEFAULT_TARGET, bucket_start, bucket_starts, bucket_label
+from view_cache import cached_view
+
+# Personal KPIs on the intern dashboard: entry metric -> User column with the intern's monthly target
+KPI_TARGETS = {
+    'total_enrollments': 'target',
+    'ms_azure_900': 'ms_azure_900_target',
+    'seo_starter': 'seo_starter_target',
+    'seo_smm': 'seo_smm_target',
+    'dm_crash': 'dm_crash_target',
+    'job_ready': 'job_ready_target',
+    'azure_combo': 'azure_combo_target',
+    'recruitment': 'recruitment_target',
+    'college_db': 'college_db_target',
+    'client_db': 'client_db_target',
+    'school_lead_db': 'school_lead_db_target'
+}
+
+# Buckets shown per granularity, and the share of a monthly target each bucket gets
+KPI_PERIODS = {
+    'month': (6, 1),
+    'week': (4, 7 / 30),
+    'day': (7, 1 / 30)
+}
+
+
+def monthly_targets(user_id):
+    # {metric: monthly target} of one intern; an unset enrollment target counts as DEFAULT_TARGET
+    row = db.session.query(*[getattr(User, column) for column in KPI_TARGETS.values()]) \
+        .filter(User.id == user_id).one()
+    targets = {metric: value or 0 for metric, value in zip(KPI_TARGETS, row)}
+    targets['total_enrollments'] = targets['total_enrollments'] or DEFAULT_TARGET
+    return targets
+
+
+def kpi_query(user_id, since):
+    # Per-day sums of the KPI metrics over one intern's rollup rows from `since` on
+    return db.session.query(
+        PMSDailyRollup.day,
+        *[func.coalesce(func.sum(getattr(PMSDailyRollup, metric)), 0).label(metric) for metric in KPI_TARGETS]
+    ).filter(PMSDailyRollup.user_id == user_id, PMSDailyRollup.day >= since).group_by(PMSDailyRollup.day)
+
+
+def build_kpis(user_id):
+    """Monthly, weekly and daily KPI series of one intern against their targets.
+
+    Returns {granularity: {'labels', 'achieved': {metric: [totals]},
+    'targets': {metric: target per bucket}}}. Every granularity comes from
+    the same grouped query, which reads only this intern's rollup rows.
+    """
+    targets = monthly_targets(user_id)
+    starts = {granularity: bucket_starts(granularity, count) for granularity, (count, _) in KPI_PERIODS.items()}
+    totals = {granularity: {start: dict.fromkeys(KPI_TARGETS, 0) for start in granularity_starts}
+              for granularity, granularity_starts in starts.items()}
+
+    since = min(granularity_starts[0] for granularity_starts in starts.values())
+    for row in kpi_query(user_id, since):
+        for granularity in KPI_PERIODS:
+            bucket = totals[granularity].get(bucket_start(row.day, granularity))
+            if bucket is not None:
+                for metric in KPI_TARGETS:
+                    bucket[metric] += int(getattr(row, metric))
+
+    return {
+        granularity: {
+            'labels': [bucket_label(start, granularity) for start in starts[granularity]],
+            'achieved': {metric: [totals[granularity][start][metric] for start in starts[granularity]]
+                         for metric in KPI_TARGETS},
+            'targets': {metric: round(target * share, 1) for metric, target in targets.items()}
+        }
+        for granularity, (_, share) in KPI_PERIODS.items()
+    }
+
+
+def intern_kpis(user_id):
+    # build_kpis(user_id), cached per intern until the data version moves on
+    return cached_view('intern_kpis', lambda: build_kpis(user_id), user_id)
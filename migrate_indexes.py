@@ -0,0 +1,43 @@
+from sqlalchemy import func, text
+from sqlalchemy.schema import CreateIndex
+from app import app, db
+from models import PMSEntry, PMS_ENTRY_KEY
+from rollups import rebuild_rollups
+from analytics import invalidate_buckets
+from view_cache import bump_data_version
+
+# Indexes no longer declared on PMSEntry; uq_pms_entry_key covers their lookups
+DROPPED_INDEXES = ['ix_pms_entry_user_date_section']
+
+def remove_duplicate_entries():
+    # uq_pms_entry_key allows one entry per intern, day and section; keep the latest of each
+    latest = db.session.query(func.max(PMSEntry.id)).group_by(*PMS_ENTRY_KEY)
+    removed = PMSEntry.query.filter(PMSEntry.id.notin_(latest)).delete(synchronize_session=False)
+    if removed:
+        rebuild_rollups()
+    db.session.commit()
+    if removed:
+        invalidate_buckets()
+        bump_data_version()
+    return removed
+
+def migrate_indexes():
+    with app.app_context():
+        removed = remove_duplicate_entries()
+        print(f"Removed {removed} duplicate entries")
+        
+        # Create any index declared on PMSEntry that the database doesn't have yet
+        # (IF NOT EXISTS, as SQLite can't reflect the expression in uq_pms_entry_key)
+        with db.engine.begin() as connection:
+            for index in sorted(PMSEntry.__table__.indexes, key=lambda i: i.name):
+                connection.execute(CreateIndex(index, if_not_exists=True))
+                print(f"Index {index.name} is in place")
+            
+            for name in DROPPED_INDEXES:
+                connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+                print(f"Index {name} is dropped")
+        
+        print("Index migration completed successfully!")
+
+if __name__ == "__main__":
+    migrate_indexes()
@@ -1,8 +1,15 @@
 from app import app, db
 from models import User, Team, PMSEntry
+from user_cache import forget_users
+from view_cache import bump_data_version
 import sqlite3
 import os
 
+# Enrollment targets of team PoCs, team members and whole teams
+POC_TARGET = 50
+MEMBER_TARGET = 30
+TEAM_TARGET = 150
+
 def migrate_teams():
     with app.app_context():
         # Create teams table if it doesn't exist
@@ -34,21 +41,21 @@ def migrate_teams():
                 team.poc_id = poc.id
                 
                 # Set targets
-                poc.target = 50
-                team.target = 150
+                poc.target = POC_TARGET
+                team.target = TEAM_TARGET
                 
                 db.session.commit()
                 print(f"Set {poc.name} as PoC for {team.name}")
             
-            # Assign members
-            for member_name in team_data["members"]:
-                member = User.query.filter_by(name=member_name).first()
-                if member:
-                    member.team_id = team.id
-                    member.target = 30
-                    db.session.commit()
-                    print(f"Added {member.name} to {team.name}")
+            # Assign members and their target in one UPDATE per team
+            added = User.query.filter(User.name.in_(team_data["members"])).update(
+                {'team_id': team.id, 'target': MEMBER_TARGET}, synchronize_session=False)
+            db.session.commit()
+            print(f"Added {added} members to {team.name}")
         
+        # PoC flags and targets changed behind every worker's caches
+        forget_users()
+        bump_data_version()
         print("Team migration completed successfully!")
 
 if __name__ == "__main__":
@@ -2,9 +2,27 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+import hmac
+import json
 
 db = SQLAlchemy()
 
+# Password given to interns created in bulk (sheet imports)
+DEFAULT_PASSWORD = 'password123'
+
+# Stored as password_hash for bulk-created interns instead of hashing DEFAULT_PASSWORD
+# once per row; the real hash is written on their first successful login
+DEFERRED_PASSWORD = '!deferred'
+
+# Keep IN (...) lists well below the bound-parameter limits of SQLite
+IN_CHUNK_SIZE = 500
+
+def in_chunks(items, size=IN_CHUNK_SIZE):
+    # `items` as lists of at most `size`, e.g. for the values of an IN (...) filter
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
 class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(100), unique=True, nullable=False)
@@ -39,7 +57,25 @@ class User(db.Model, UserMixin):
         self.password_hash = generate_password_hash(password)
     
     def check_password(self, password):
+        if self.password_deferred:
+            return hmac.compare_digest((password or '').encode(), DEFAULT_PASSWORD.encode())
         return check_password_hash(self.password_hash, password)
+    
+    @property
+    def password_deferred(self):
+        return self.password_hash == DEFERRED_PASSWORD
+
+class TargetRule(db.Model):
+    # Target given to every intern of a post (see targets.apply_target_rules).
+    # A rule without a post covers the interns no rule of their post covers.
+    id = db.Column(db.Integer, primary_key=True)
+    post = db.Column(db.String(50))  # None for every other post
+    field = db.Column(db.String(50), nullable=False)  # User target column, e.g. 'college_db_target'
+    value = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.UniqueConstraint('post', 'field', name='uq_target_rule'),
+    )
 
 class PMSEntry(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -86,4 +122,117 @@ class PMSEntry(db.Model):
     support_required = db.Column(db.Text)
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Indexes for the hot route queries (see check_query_plans.py): daily and
+    # date-range reports, and section-filtered reports. Per-intern lookups by
+    # day/section and history ranges use uq_pms_entry_key below.
+    __table_args__ = (
+        db.Index('ix_pms_entry_date', 'date'),
+        db.Index('ix_pms_entry_section_date', 'section', 'date'),
+    )
+
+# One entry per intern, day and section. Entries without a section (admin-entered
+# numbers and sheet imports) are keyed as section '', so they are unique as well.
+PMS_ENTRY_KEY = [PMSEntry.user_id, PMSEntry.date, db.func.coalesce(PMSEntry.section, db.literal_column("''"))]
+db.Index('uq_pms_entry_key', *PMS_ENTRY_KEY, unique=True)
+
+class PMSDailyRollup(db.Model):
+    # Pre-summed PMSEntry metrics per intern, post, section and day.
+    # Maintained by rollups.refresh_rollups() whenever entries are written.
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    post = db.Column(db.String(50))
+    section = db.Column(db.String(50))
+    day = db.Column(db.Date, nullable=False)
+    week_start = db.Column(db.Date, nullable=False)  # Monday of the ISO week
+    month_start = db.Column(db.Date, nullable=False)  # First day of the month
+    entry_count = db.Column(db.Integer, default=0)
+    
+    # Summed metrics (same names as PMSEntry)
+    total_enrollments = db.Column(db.Integer, default=0)
+    mtd_leads = db.Column(db.Integer, default=0)
+    ms_azure_900 = db.Column(db.Integer, default=0)
+    seo_starter = db.Column(db.Integer, default=0)
+    seo_smm = db.Column(db.Integer, default=0)
+    dm_crash = db.Column(db.Integer, default=0)
+    job_ready = db.Column(db.Integer, default=0)
+    azure_combo = db.Column(db.Integer, default=0)
+    recruitment = db.Column(db.Integer, default=0)
+    college_db = db.Column(db.Integer, default=0)
+    client_db = db.Column(db.Integer, default=0)
+    school_lead_db = db.Column(db.Integer, default=0)
+    daily_leads_generated = db.Column(db.Integer, default=0)
+    daily_leads_contacted = db.Column(db.Integer, default=0)
+    daily_prospects = db.Column(db.Integer, default=0)
+    daily_suspects = db.Column(db.Integer, default=0)
+    applications_received = db.Column(db.Integer, default=0)
+    interviewed = db.Column(db.Integer, default=0)
+    on_hold = db.Column(db.Integer, default=0)
+    shortlisted = db.Column(db.Integer, default=0)
+    rejected = db.Column(db.Integer, default=0)
+    
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'post', 'section', 'day', name='uq_rollup_key'),
+        db.Index('ix_rollup_day', 'day'),
+        db.Index('ix_rollup_month_user', 'month_start', 'user_id'),
+    )
+
+class DataVersion(db.Model):
+    # Single row counting writes to entries, interns and targets; cached views
+    # are rebuilt once it moves on (see view_cache.py)
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    # When the row was created (ms); tells databases sharing a cache file apart
+    epoch = db.Column(db.BigInteger, nullable=False, default=0)
+
+class BackgroundJob(db.Model):
+    # Work queued for the in-process job runner (see jobs.py)
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # 'import', 'purge'
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    filename = db.Column(db.String(255))
+    payload = db.Column(db.LargeBinary)  # Uploaded file, cleared once the job finishes
+    content_hash = db.Column(db.String(64))  # SHA-256 of the upload, to skip identical re-uploads
+    params = db.Column(db.Text)  # JSON options, e.g. the scope of a purge
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'))
+    
+    # Progress
+    rows_parsed = db.Column(db.Integer, default=0)
+    rows_inserted = db.Column(db.Integer, default=0)
+    rows_updated = db.Column(db.Integer, default=0)
+    rows_failed = db.Column(db.Integer, default=0)
+    rows_deleted = db.Column(db.Integer, default=0)
+    log = db.Column(db.Text, default='')
+    error = db.Column(db.Text)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        db.Index('ix_background_job_status', 'status', 'id'),
+        db.Index('ix_background_job_content_hash', 'content_hash'),
+    )
+    
+    def add_log(self, message):
+        self.log = (self.log or '') + message + '\n'
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'filename': self.filename,
+            'rows_parsed': self.rows_parsed,
+            'rows_inserted': self.rows_inserted,
+            'rows_updated': self.rows_updated,
+            'rows_failed': self.rows_failed,
+            'rows_deleted': self.rows_deleted,
+            'params': json.loads(self.params) if self.params else None,
+            'log': (self.log or '').splitlines(),
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
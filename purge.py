@@ -0,0 +1,119 @@
+from datetime import date
+from sqlalchemy import and_, or_, select, text
+from models import db, User, PMSEntry, PMSDailyRollup
+
+# Rows deleted per transaction, so a purge never holds locks on a whole table for long
+PURGE_CHUNK_SIZE = 5000
+
+# Tables emptied with TRUNCATE on PostgreSQL when everything is purged
+TRUNCATE_TABLES = ['pms_entry', 'pms_daily_rollup']
+
+
+def purge_scope(values):
+    """Read a purge scope from request values: start_date, end_date (YYYY-MM-DD) and post.
+
+    Empty values are left out. An empty scope purges everything, so it is
+    only returned for scope=all; without that at least one value is required.
+    Raises ValueError for malformed or missing values, or an end before the start.
+    """
+    if values.get('scope') == 'all':
+        return {}
+
+    scope = {}
+    for key in ('start_date', 'end_date'):
+        value = (values.get(key) or '').strip()
+        if value:
+            scope[key] = date.fromisoformat(value).isoformat()
+    post = (values.get('post') or '').strip()
+    if post:
+        scope['post'] = post
+
+    if not scope:
+        raise ValueError('Choose a start date, an end date or a post')
+    if scope.get('start_date', '') > scope.get('end_date', '9999-12-31'):
+        raise ValueError('The end date is before the start date')
+    return scope
+
+
+def describe_scope(scope):
+    if not scope:
+        return 'all data'
+    parts = ['entries']
+    if 'start_date' in scope:
+        parts.append(f"from {scope['start_date']}")
+    if 'end_date' in scope:
+        parts.append(f"to {scope['end_date']}")
+    if 'post' in scope:
+        parts.append(f"of {scope['post']} interns")
+    return ' '.join(parts)
+
+
+def _scope_filters(model, date_column, scope):
+    filters = []
+    if 'start_date' in scope:
+        filters.append(date_column >= date.fromisoformat(scope['start_date']))
+    if 'end_date' in scope:
+        filters.append(date_column <= date.fromisoformat(scope['end_date']))
+    if 'post' in scope:
+        if model is PMSEntry:
+            # Entries without a post belong to their intern's post, as in the rollups
+            intern_ids = select(User.id).where(User.post == scope['post'])
+            filters.append(or_(PMSEntry.post == scope['post'],
+                               and_(PMSEntry.post.is_(None), PMSEntry.user_id.in_(intern_ids))))
+        else:
+            filters.append(model.post == scope['post'])
+    return filters
+
+
+def delete_in_chunks(model, filters, progress=None, size=PURGE_CHUNK_SIZE):
+    """Delete the rows of `model` matching `filters`, committing every `size` rows.
+
+    Each chunk is the id range of the next `size` matching rows. Chunks already
+    committed stay deleted if a later one fails. `progress(deleted)` is called
+    before each commit. Returns the number of rows deleted.
+    """
+    deleted = 0
+    last_id = 0
+    while True:
+        ids = [row_id for row_id, in db.session.query(model.id).filter(*filters, model.id > last_id)
+               .order_by(model.id).limit(size)]
+        if not ids:
+            return deleted
+
+        deleted += model.query.filter(*filters, model.id >= ids[0], model.id <= ids[-1]) \
+            .delete(synchronize_session=False)
+        last_id = ids[-1]
+        if progress:
+            progress(deleted)
+        db.session.commit()
+
+
+def purge_data(scope, progress=None):
+    """Delete the PMS entries within `scope` (see purge_scope) and their rollups.
+
+    An empty scope also deletes every intern. Rows go in committed chunks
+    (see delete_in_chunks), except that a full purge on PostgreSQL empties
+    the entry and rollup tables with TRUNCATE. `progress(deleted, total)` is
+    called as entries go. Returns deleted row counts per table.
+    """
+    entry_filters = _scope_filters(PMSEntry, PMSEntry.date, scope)
+    total = PMSEntry.query.filter(*entry_filters).count()
+
+    def entry_progress(deleted):
+        if progress:
+            progress(deleted, total)
+
+    result = {}
+    if not scope and db.engine.dialect.name == 'postgresql':
+        result['rollups'] = PMSDailyRollup.query.count()
+        db.session.execute(text(f"TRUNCATE TABLE {', '.join(TRUNCATE_TABLES)}"))
+        result['entries'] = total
+        entry_progress(total)
+        db.session.commit()
+    else:
+        result['entries'] = delete_in_chunks(PMSEntry, entry_filters, entry_progress)
+        # Rollup rows share the scope's post and day, so they go by the same filters
+        result['rollups'] = delete_in_chunks(PMSDailyRollup, _scope_filters(PMSDailyRollup, PMSDailyRollup.day, scope))
+
+    result['interns'] = delete_in_chunks(User, [User.role == 'intern']) if not scope else 0
+    return result
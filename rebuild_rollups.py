@@ -0,0 +1,31 @@
+import sys
+from app import app, db
+from rollups import rebuild_rollups, verify_rollups
+from analytics import invalidate_buckets
+from view_cache import bump_data_version
+
+def rebuild():
+    with app.app_context():
+        # Create the rollup table if it doesn't exist
+        db.create_all()
+        
+        print("Rebuilding daily rollups from PMS entries...")
+        row_count = rebuild_rollups()
+        db.session.commit()
+        invalidate_buckets()
+        bump_data_version()
+        print(f"Wrote {row_count} rollup rows")
+        
+        # Check the rollup against the raw entries
+        mismatches = verify_rollups()
+        if mismatches:
+            print(f"Rollup does not match raw entries for {len(mismatches)} intern-days:")
+            for user_id, day in mismatches[:20]:
+                print(f"  user {user_id} on {day}")
+            return False
+        
+        print("Rollup verified against raw entries.")
+        return True
+
+if __name__ == "__main__":
+    sys.exit(0 if rebuild() else 1)
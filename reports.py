@@ -0,0 +1,201 @@
+import csv
+import io
+import tempfile
+from datetime import datetime
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import joinedload
+from models import User, PMSEntry
+
+# Page size for /admin/reports unless REPORTS_PAGE_SIZE or ?per_page= says otherwise
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Metrics summed over the whole filtered report
+REPORT_METRICS = ['mtd_leads', 'daily_leads_generated', 'daily_leads_contacted', 'daily_prospects',
+                  'daily_suspects', 'applications_received', 'interviewed', 'on_hold',
+                  'shortlisted', 'rejected']
+
+
+def report_filters(args):
+    # The report filters present in the request arguments
+    filters = {}
+    if args.get('user_id', type=int):
+        filters['user_id'] = args.get('user_id', type=int)
+    for key in ('section', 'start_date', 'end_date'):
+        if args.get(key):
+            filters[key] = args.get(key)
+    return filters
+
+
+def filtered_entries(filters):
+    # Base PMSEntry query with the report filters applied
+    query = PMSEntry.query
+    if 'user_id' in filters:
+        query = query.filter_by(user_id=filters['user_id'])
+    if 'section' in filters:
+        query = query.filter_by(section=filters['section'])
+    if 'start_date' in filters:
+        query = query.filter(PMSEntry.date >= datetime.strptime(filters['start_date'], '%Y-%m-%d').date())
+    if 'end_date' in filters:
+        query = query.filter(PMSEntry.date <= datetime.strptime(filters['end_date'], '%Y-%m-%d').date())
+    return query
+
+
+def encode_cursor(entry):
+    return f"{entry.date.strftime('%Y-%m-%d')}_{entry.id}"
+
+
+def decode_cursor(cursor):
+    # The (date, id) key of a cursor from the request, or None if it is malformed
+    try:
+        day, entry_id = cursor.split('_')
+        key = datetime.strptime(day, '%Y-%m-%d').date(), int(entry_id)
+    except ValueError:
+        return None
+    # Ids beyond 64 bits cannot be bound as a query parameter
+    return key if 0 <= key[1] < 2 ** 63 else None
+
+
+def page_query(query, page_size, after=None, before=None):
+    # The rows report_page reads: one past the page, walking away from the decoded cursor
+    key = tuple_(PMSEntry.date, PMSEntry.id)
+    query = query.options(joinedload(PMSEntry.user))
+    if before:
+        return query.filter(key > tuple_(*before)) \
+            .order_by(PMSEntry.date.asc(), PMSEntry.id.asc()).limit(page_size + 1)
+    if after:
+        query = query.filter(key < tuple_(*after))
+    return query.order_by(PMSEntry.date.desc(), PMSEntry.id.desc()).limit(page_size + 1)
+
+
+def report_page(query, page_size, after=None, before=None):
+    """Return one page of entries, newest first, using keyset pagination on (date, id).
+
+    `after` fetches the page older than that cursor and `before` the page newer
+    than it, so any page costs the same index range scan as the first one.
+    Returns (entries, older_cursor, newer_cursor); a cursor is None when there
+    is nothing further in that direction. A malformed cursor is ignored, so it
+    gives the first page.
+    """
+    after = decode_cursor(after) if after else None
+    before = decode_cursor(before) if before else None
+    rows = page_query(query, page_size, after, before).all()
+
+    if before:
+        # Rows come oldest first from the cursor; flip back to newest-first
+        has_newer = len(rows) > page_size
+        entries = list(reversed(rows[:page_size]))
+        has_older = True
+    else:
+        has_older = len(rows) > page_size
+        entries = rows[:page_size]
+        has_newer = after is not None
+
+    older = encode_cursor(entries[-1]) if entries and has_older else None
+    newer = encode_cursor(entries[0]) if entries and has_newer else None
+    return entries, older, newer
+
+
+def report_summary(query):
+    # Row count and metric totals for the whole filtered report, computed in SQL
+    row = query.order_by(None).with_entities(
+        func.count(PMSEntry.id),
+        *[func.coalesce(func.sum(getattr(PMSEntry, metric)), 0) for metric in REPORT_METRICS]
+    ).one()
+    summary = {'count': int(row[0])}
+    summary.update(zip(REPORT_METRICS, (int(value) for value in row[1:])))
+    return summary
+
+
+# Columns written by the report export, in order
+EXPORT_COLUMNS = [
+    ('Date', PMSEntry.date),
+    ('Intern Name', User.name),
+    ('POC', PMSEntry.poc),
+    ('Post', PMSEntry.post),
+    ('Section', PMSEntry.section),
+    ('Email Id', PMSEntry.email_id),
+    ('Total Enrollments', PMSEntry.total_enrollments),
+    ('MS Azure 900', PMSEntry.ms_azure_900),
+    ('SEO Starter', PMSEntry.seo_starter),
+    ('SEO + SMM', PMSEntry.seo_smm),
+    ('DM-Crash', PMSEntry.dm_crash),
+    ('8Hrs Job Ready', PMSEntry.job_ready),
+    ('Azure Combo', PMSEntry.azure_combo),
+    ('Recruitment', PMSEntry.recruitment),
+    ('College DB', PMSEntry.college_db),
+    ('Client DB', PMSEntry.client_db),
+    ('School Lead DB', PMSEntry.school_lead_db),
+    ('MTD', PMSEntry.mtd_leads),
+    ('Leads Generated', PMSEntry.daily_leads_generated),
+    ('Leads Contacted', PMSEntry.daily_leads_contacted),
+    ('Prospects', PMSEntry.daily_prospects),
+    ('Suspects', PMSEntry.daily_suspects),
+    ('Applications', PMSEntry.applications_received),
+    ('Interviewed', PMSEntry.interviewed),
+    ('On Hold', PMSEntry.on_hold),
+    ('Shortlisted', PMSEntry.shortlisted),
+    ('Rejected', PMSEntry.rejected),
+    ('Support Required', PMSEntry.support_required)
+]
+EXPORT_HEADERS = [header for header, _ in EXPORT_COLUMNS]
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_FETCH_SIZE = 1000
+
+
+def export_rows(query):
+    """Yield the filtered report as plain tuples, newest first.
+
+    yield_per() makes the driver stream results (a server-side cursor on
+    PostgreSQL), so only one batch of rows is held in memory at a time.
+    """
+    query = query.join(User, User.id == PMSEntry.user_id) \
+        .order_by(PMSEntry.date.desc(), PMSEntry.id.desc()) \
+        .with_entities(*[column for _, column in EXPORT_COLUMNS]) \
+        .yield_per(EXPORT_FETCH_SIZE)
+    for row in query:
+        yield tuple(row)
+
+
+def csv_chunks(rows, batch_size=500):
+    # Encode rows as CSV text, yielding every `batch_size` rows; the header goes out immediately
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_HEADERS)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate(0)
+
+    for index, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if index % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
+
+
+def xlsx_chunks(rows, chunk_size=64 * 1024):
+    """Write rows to a write-only openpyxl workbook and yield the file in chunks.
+
+    Write-only mode keeps memory flat, but an .xlsx is a zip archive that can
+    only be finished after the last row, so the first bytes go out once the
+    query has been read.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Report')
+    sheet.append(EXPORT_HEADERS)
+    for row in rows:
+        sheet.append(row)
+
+    with tempfile.TemporaryFile() as output:
+        workbook.save(output)
+        output.seek(0)
+        while True:
+            chunk = output.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
@@ -0,0 +1,123 @@
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from models import db, User, PMSEntry, PMSDailyRollup, in_chunks
+
+# PMSEntry metric columns that are pre-summed into PMSDailyRollup
+ROLLUP_METRICS = [
+    'total_enrollments', 'mtd_leads', 'ms_azure_900', 'seo_starter', 'seo_smm',
+    'dm_crash', 'job_ready', 'azure_combo', 'recruitment', 'college_db',
+    'client_db', 'school_lead_db', 'daily_leads_generated', 'daily_leads_contacted',
+    'daily_prospects', 'daily_suspects', 'applications_received', 'interviewed',
+    'on_hold', 'shortlisted', 'rejected'
+]
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _rollup_query():
+    # Raw entries grouped to rollup granularity; entries without a post fall back to the intern's post
+    post = func.coalesce(PMSEntry.post, User.post)
+    return db.session.query(
+        PMSEntry.user_id,
+        post,
+        PMSEntry.section,
+        PMSEntry.date,
+        func.count(PMSEntry.id),
+        *[func.coalesce(func.sum(getattr(PMSEntry, metric)), 0) for metric in ROLLUP_METRICS]
+    ).join(User, User.id == PMSEntry.user_id).group_by(
+        PMSEntry.user_id, post, PMSEntry.section, PMSEntry.date
+    )
+
+
+def _rollup_rows(query):
+    rows = []
+    for user_id, post, section, day, entry_count, *sums in query:
+        day = _as_date(day)
+        row = {
+            'user_id': user_id,
+            'post': post,
+            'section': section,
+            'day': day,
+            'week_start': day - timedelta(days=day.weekday()),
+            'month_start': day.replace(day=1),
+            'entry_count': entry_count
+        }
+        row.update(zip(ROLLUP_METRICS, (int(value) for value in sums)))
+        rows.append(row)
+    return rows
+
+
+def touched_keys(entries):
+    # (user_id, day) pairs whose rollup rows must be refreshed after writing these entries
+    return {(entry.user_id, _as_date(entry.date)) for entry in entries}
+
+
+def refresh_rollups(keys):
+    """Recompute the rollup rows for the given (user_id, day) pairs.
+
+    Runs in the caller's session, so the rollup is committed (or rolled back)
+    together with the entries that changed it. Returns the days touched; once
+    it has committed, the caller passes them to analytics.invalidate_buckets,
+    so no other worker can cache the old totals again in between.
+    """
+    users_by_day = {}
+    for user_id, day in keys:
+        users_by_day.setdefault(_as_date(day), set()).add(user_id)
+
+    for day, user_ids in users_by_day.items():
+        for chunk in in_chunks(user_ids):
+            PMSDailyRollup.query.filter(
+                PMSDailyRollup.day == day,
+                PMSDailyRollup.user_id.in_(chunk)
+            ).delete(synchronize_session=False)
+
+            rows = _rollup_rows(_rollup_query().filter(PMSEntry.date == day, PMSEntry.user_id.in_(chunk)))
+            if rows:
+                db.session.bulk_insert_mappings(PMSDailyRollup, rows)
+
+    return set(users_by_day)
+
+
+def delete_rollups(user_ids=None):
+    # Drop rollup rows along with the entries they summarise; after committing,
+    # the caller calls analytics.invalidate_buckets()
+    query = PMSDailyRollup.query
+    if user_ids is not None:
+        query = query.filter(PMSDailyRollup.user_id.in_(list(user_ids)))
+    query.delete(synchronize_session=False)
+
+
+def rebuild_rollups():
+    # Backfill the whole rollup table from PMSEntry; the caller commits, then calls
+    # analytics.invalidate_buckets()
+    delete_rollups()
+    rows = _rollup_rows(_rollup_query())
+    for chunk in in_chunks(rows, 5000):
+        db.session.bulk_insert_mappings(PMSDailyRollup, chunk)
+    return len(rows)
+
+
+def verify_rollups():
+    """Compare per-intern daily sums of the rollup against the raw entries.
+
+    Returns a list of (user_id, day) pairs that disagree.
+    """
+    def daily_sums(query):
+        return {(user_id, _as_date(day)): tuple(int(value) for value in sums) for user_id, day, *sums in query}
+
+    raw = daily_sums(db.session.query(
+        PMSEntry.user_id,
+        PMSEntry.date,
+        func.count(PMSEntry.id),
+        *[func.coalesce(func.sum(getattr(PMSEntry, metric)), 0) for metric in ROLLUP_METRICS]
+    ).group_by(PMSEntry.user_id, PMSEntry.date))
+
+    rolled = daily_sums(db.session.query(
+        PMSDailyRollup.user_id,
+        PMSDailyRollup.day,
+        func.coalesce(func.sum(PMSDailyRollup.entry_count), 0),
+        *[func.coalesce(func.sum(getattr(PMSDailyRollup, metric)), 0) for metric in ROLLUP_METRICS]
+    ).group_by(PMSDailyRollup.user_id, PMSDailyRollup.day))
+
+    return sorted(key for key in raw.keys() | rolled.keys() if raw.get(key) != rolled.get(key))
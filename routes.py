@@ -1,17 +1,40 @@
-from flask import render_template, redirect, url_for, flash, request, session
+from flask import render_template, redirect, url_for, flash, request, session, Response, stream_with_context, jsonify
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash
 from werkzeug.utils import secure_filename
-from datetime import datetime, date
+from datetime import date
 import uuid
-import os
-import csv
-from models import db, User, PMSEntry
+from models import db, User, PMSEntry, PMSDailyRollup, BackgroundJob
+from analytics import load_analytics_frames, analytics_series, post_series, progress_percent, latest_entries, time_series, comparison_series, invalidate_buckets
+from rollups import refresh_rollups, touched_keys
+from entries import upsert_entries, day_entries, section_entry, admin_numbers
+from targets import parse_target_form, parse_target_json, apply_target_changes, seed_target_rules, apply_target_rules
+from jobs import enqueue_job, job_progress, content_hash, find_duplicate_upload, forget_uploads
+from purge import purge_scope, describe_scope, delete_in_chunks
+from user_cache import forget_users, user_cache
+from view_cache import cached_view, plain_rows, bump_data_version, data_version, view_cache
+from shared_cache import shared_cache
+from charts import chart_etag, entries_etag, chart_response
+from kpis import intern_kpis, monthly_targets
+from reports import report_filters, filtered_entries, report_page, report_summary, export_rows, csv_chunks, xlsx_chunks, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from app import app
 
 # Constants
 SECTIONS = ['Human Resources', 'Business Development', 'Sales & Marketing', 'Marketing']
 
+# Entry metrics edited on /admin/manage_intern_numbers
+INTERN_NUMBER_FIELDS = ['total_enrollments', 'ms_azure_900', 'seo_starter', 'seo_smm', 'dm_crash', 'job_ready',
+                        'azure_combo', 'recruitment', 'college_db', 'client_db', 'school_lead_db']
+
+# Intern columns the cached admin views show
+INTERN_VIEW_COLUMNS = [User.id, User.name, User.post, User.poc_name, User.doj, User.is_poc, User.target,
+                       User.tnd_total_target, User.recruitment_target, User.college_db_target,
+                       User.client_db_target, User.school_lead_db_target]
+
+def intern_rows():
+    # Every intern as a dict of INTERN_VIEW_COLUMNS, for the cached admin views
+    return plain_rows(db.session.query(*INTERN_VIEW_COLUMNS).filter(User.role == 'intern'))
+
 @app.route('/')
 def index():
     return render_template('home.html')
@@ -48,6 +71,10 @@ def intern_login():
         user = User.query.filter_by(username=username).first()
         
         if user and user.check_password(password) and user.role == 'intern':
+            if user.password_deferred:
+                # Interns created by an import get their password hashed on first login
+                user.set_password(password)
+                db.session.commit()
             login_user(user)
             next_page = request.args.get('next')
             return redirect(next_page or url_for('intern_dashboard'))
@@ -69,19 +96,23 @@ def admin_dashboard():
         flash('Access denied. Admin privileges required.', 'danger')
         return redirect(url_for('admin_login'))
     
+    return render_template('admin_dashboard.html', **cached_view('admin_dashboard', admin_dashboard_context))
+
+def admin_dashboard_context():
     # Get all interns
-    interns = User.query.filter_by(role='intern').all()
+    interns = intern_rows()
     
-    # Get today's entries
+    # Get today's entries, with the name of the intern each one belongs to
     today = date.today()
-    today_entries = PMSEntry.query.filter(PMSEntry.date == today).all()
+    today_entries = plain_rows(day_entries(today).join(User, User.id == PMSEntry.user_id)
+                               .with_entities(*PMSEntry.__table__.columns, User.name.label('user_name')))
     
     # Debug info
     print(f"Found {len(today_entries)} entries for today")
     for entry in today_entries:
-        print(f"Entry: {entry.user.name}, {entry.post}, {entry.total_enrollments}")
+        print(f"Entry: {entry['user_name']}, {entry['post']}, {entry['total_enrollments']}")
     
-    return render_template('admin_dashboard.html', interns=interns, entries=today_entries)
+    return {'interns': interns, 'entries': today_entries}
 
 @app.route('/admin/analytics')
 @login_required
@@ -90,167 +121,186 @@ def admin_analytics():
         flash('Access denied. Admin privileges required.', 'danger')
         return redirect(url_for('admin_login'))
     
-    # Get all interns
-    interns = User.query.filter_by(role='intern').all()
-    
-    # Get all entries
-    entries = PMSEntry.query.all()
-    
-    # Get today's entries
-    today = date.today()
-    today_entries = PMSEntry.query.filter(PMSEntry.date == today).all()
+    return render_template('admin_analytics.html', **cached_view('admin_analytics', admin_analytics_context))
+
+def admin_analytics_context():
+    # Get all interns, each with their latest entry
+    interns = intern_rows()
+    latest = latest_entries()
+    for intern in interns:
+        intern['latest'] = latest.get(intern['id'])
+    latest_totals = {field: sum(entry[field] or 0 for entry in latest.values()) for field in INTERN_NUMBER_FIELDS}
     
     # Get unique posts from interns
     posts = []
     for intern in interns:
-        if intern.post and intern.post not in posts:
-            posts.append(intern.post)
+        if intern['post'] and intern['post'] not in posts:
+            posts.append(intern['post'])
+    
+    # Per-post targets and metric sums
+    series = analytics_series(*load_analytics_frames())
+    totals = series['posts']
+    overall = series['overall']
     
     # Calculate team performance data
     team_data = {}
     
     # Group interns by post instead of section
     for post in posts:
-        post_interns = [i for i in interns if i.post == post]
-        post_entries = []
+        post_interns = [i for i in interns if i['post'] == post]
+        post_total = totals[post]
         
-        # Collect all entries for interns in this post
-        for intern in post_interns:
-            post_entries.extend(intern.pms_entries)
+        # Find PoC (assuming is_poc flag is set in the database)
+        poc = next((i for i in post_interns if i['is_poc']), post_interns[0])
         
-        if post_interns:
-            # Find PoC (assuming is_poc flag is set in the database)
-            poc = next((i for i in post_interns if i.is_poc), post_interns[0] if post_interns else None)
-            
-            # Calculate team progress using individual targets
-            total_target = sum(intern.target or 50 for intern in post_interns)
-            
-            # Sum total enrollments from all entries
-            total_achieved = sum(entry.total_enrollments for entry in post_entries if hasattr(entry, 'total_enrollments'))
-            
-            progress = int((total_achieved / total_target * 100) if total_target > 0 else 0)
-            
-            team_data[post] = {
-                'poc': poc,
-                'members': post_interns,
-                'progress': progress,
-                'total_target': total_target,
-                'total_achieved': total_achieved,
-                'entries': post_entries
-            }
-    
-    # Calculate summary metrics
-    total_interns = len(interns)
-    total_enrollments = sum(entry.total_enrollments for intern in interns 
-                           for entry in intern.pms_entries if hasattr(entry, 'total_enrollments'))
-    
-    # Calculate overall progress using individual targets
-    total_target = sum(intern.target or 50 for intern in interns)
-    overall_progress = int((total_enrollments / total_target * 100) if total_target > 0 else 0)
-    
-    # Calculate school lead DB total
-    school_lead_db = sum(entry.school_lead_db for intern in interns 
-                        for entry in intern.pms_entries if hasattr(entry, 'school_lead_db'))
+        team_data[post] = {
+            'poc': poc,
+            'members': post_interns,
+            'progress': progress_percent(post_total['total_enrollments'], post_total['target']),
+            'total_target': post_total['target'],
+            'total_achieved': post_total['total_enrollments'],
+            'school_lead_db': post_total['school_lead_db'],
+            'college_db': post_total['college_db'],
+            'client_db': post_total['client_db']
+        }
     
     # Prepare metrics for the template
     metrics = {
-        'total_interns': total_interns,
-        'total_enrollments': total_enrollments,
-        'overall_progress': overall_progress,
-        'school_lead_db': school_lead_db
+        'total_interns': len(interns),
+        'total_enrollments': overall['total_enrollments'],
+        'overall_progress': progress_percent(overall['total_enrollments'], overall['target']),
+        'school_lead_db': overall['school_lead_db']
     }
     
-    # Prepare data for section chart
-    section_labels = []
-    section_targets = []
-    section_achievements = []
-    
-    for post in posts:
-        section_labels.append(post)
-        post_interns = [i for i in interns if i.post == post]
-        post_target = sum(intern.target or 50 for intern in post_interns)
-        section_targets.append(post_target)
-        
-        post_achievements = sum(entry.total_enrollments for intern in post_interns 
-                              for entry in intern.pms_entries if hasattr(entry, 'total_enrollments'))
-        section_achievements.append(post_achievements)
-    
-    # Prepare data for trend chart
-    trend_months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun']
+    return {
+        'interns': interns,
+        'latest_totals': latest_totals,
+        'team_data': team_data,
+        'sections': SECTIONS,
+        'posts': posts,
+        'metrics': metrics
+    }
+
+# Helper function to get color for post
+def get_color_for_post(post):
+    color_map = {
+        'Human Resources': '#17a2b8',
+        'Business Development': '#28a745',
+        'Sales & Marketing': '#6f42c1',
+        'Marketing': '#dc3545'
+    }
+    return color_map.get(post, '#6c757d')  # Default gray color
+
+# Helper function to get background color for post
+def get_background_color_for_post(post, alpha=0.1):
+    color = get_color_for_post(post)
+    # Convert hex to rgba
+    if color.startswith('#'):
+        r = int(color[1:3], 16)
+        g = int(color[3:5], 16)
+        b = int(color[5:7], 16)
+        return f'rgba({r}, {g}, {b}, {alpha})'
+    return color
+
+# Charts drawn from JSON fetched after the page loads (see charts.py)
+ADMIN_CHARTS = ['sections', 'trend', 'comparison', 'distribution', 'posts']
+INTERN_CHARTS = {'monthly': 'month', 'weekly': 'week', 'daily': 'day', 'target': 'month'}
+
+@app.route('/admin/charts/<chart>')
+@login_required
+def admin_chart(chart):
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+    if chart not in ADMIN_CHARTS:
+        return jsonify({'error': 'Chart not found'}), 404
+
+    # Every write moves the data version, so it stands in for the entries (and the
+    # intern targets and posts) without scanning them
+    etag = chart_etag(f'admin/{chart}', data_version())
+    return chart_response(etag, lambda: cached_view('admin_charts', admin_charts_context)[chart])
+
+def admin_charts_context():
+    # Every admin chart at once, since they share the same series
+    interns = User.query.filter_by(role='intern').all()
+
+    # Get unique posts from interns
+    posts = []
+    for intern in interns:
+        if intern.post and intern.post not in posts:
+            posts.append(intern.post)
+
+    series = analytics_series(*load_analytics_frames())
+    totals = series['posts']
+
+    # Targets and achievements per team
+    section = post_series(series, posts)
+
+    # Monthly enrollments as a percentage of each team's target
+    intern_posts = {intern.id: intern.post for intern in interns}
+    trend = time_series('month', 6, intern_posts)
     trend_data = []
-    
+
     for post in posts:
         trend_data.append({
             'label': post,
-            'data': [],  # This would be filled from actual data in a real implementation
+            'data': [progress_percent(value, totals[post]['target']) for value in trend['posts'][post]],
             'borderColor': get_color_for_post(post),
             'backgroundColor': get_background_color_for_post(post),
             'borderWidth': 2,
             'fill': True,
             'tension': 0.4
         })
-    
-    # Prepare data for comparison chart
-    comparison_labels = ['Leads', 'Prospects', 'Suspects', 'Conversions', 'Follow-ups']
+
+    # This month's activity per team
+    comparison = comparison_series(intern_posts, posts)
     comparison_data = []
-    
+
     for post in posts:
         comparison_data.append({
             'label': f'{post} Team',
-            'data': [],  # This would be filled from actual data in a real implementation
+            'data': comparison['posts'][post],
             'backgroundColor': get_background_color_for_post(post, 0.2),
             'borderColor': get_color_for_post(post),
             'borderWidth': 2,
             'pointBackgroundColor': get_color_for_post(post)
         })
-    
-    # Prepare data for distribution chart
-    distribution_labels = posts
-    distribution_data = []
-    
-    for post in posts:
-        post_achievements = sum(entry.total_enrollments for intern in interns if intern.post == post 
-                              for entry in intern.pms_entries if hasattr(entry, 'total_enrollments'))
-        distribution_data.append(post_achievements)
-    
-    return render_template('admin_analytics.html', 
-                          interns=interns, 
-                          entries=today_entries, 
-                          all_entries=entries,
-                          team_data=team_data,
-                          sections=SECTIONS,
-                          posts=posts,
-                          metrics=metrics,
-                          section_labels=section_labels,
-                          section_targets=section_targets,
-                          section_achievements=section_achievements,
-                          trend_months=trend_months,
-                          trend_data=trend_data,
-                          comparison_labels=comparison_labels,
-                          comparison_data=comparison_data,
-                          distribution_labels=distribution_labels,
-                          distribution_data=distribution_data)
 
-# Helper function to get color for post
-def get_color_for_post(post):
-    color_map = {
-        'Human Resources': '#17a2b8',
-        'Business Development': '#28a745',
-        'Sales & Marketing': '#6f42c1',
-        'Marketing': '#dc3545'
+    # Interns per post, the standard posts first
+    post_labels = SECTIONS + [post for post in posts if post not in SECTIONS]
+
+    return {
+        'sections': {'labels': section['labels'], 'targets': section['targets'],
+                     'achievements': section['achievements']},
+        'trend': {'labels': trend['labels'], 'datasets': trend_data},
+        'comparison': {'labels': comparison['labels'], 'datasets': comparison_data},
+        'distribution': {'labels': posts, 'data': list(section['achievements'])},
+        'posts': {'labels': post_labels,
+                  'data': [sum(1 for intern in interns if intern.post == post) for post in post_labels]}
     }
-    return color_map.get(post, '#6c757d')  # Default gray color
 
-# Helper function to get background color for post
-def get_background_color_for_post(post, alpha=0.1):
-    color = get_color_for_post(post)
-    # Convert hex to rgba
-    if color.startswith('#'):
-        r = int(color[1:3], 16)
-        g = int(color[3:5], 16)
-        b = int(color[5:7], 16)
-        return f'rgba({r}, {g}, {b}, {alpha})'
-    return color
+@app.route('/intern/charts/<chart>')
+@login_required
+def intern_chart(chart):
+    if current_user.role != 'intern':
+        return jsonify({'error': 'Access denied'}), 403
+    if chart not in INTERN_CHARTS:
+        return jsonify({'error': 'Chart not found'}), 404
+
+    user_id = current_user.id
+    targets = monthly_targets(user_id)
+
+    def build():
+        # Enrollments against the intern's own target
+        kpis = intern_kpis(user_id)[INTERN_CHARTS[chart]]
+        achieved = kpis['achieved']['total_enrollments']
+        target = kpis['targets']['total_enrollments']
+        if chart == 'target':
+            # This month so far
+            return {'labels': ['Achieved', 'Remaining'], 'data': [achieved[-1], max(target - achieved[-1], 0)]}
+        return {'labels': kpis['labels'], 'achieved': achieved, 'target': [target] * len(achieved)}
+
+    etag = entries_etag(f'intern/{chart}', [PMSEntry.user_id == user_id], user_id, *targets.values())
+    return chart_response(etag, build)
 
 @app.route('/admin/upload_data', methods=['POST'])
 @login_required
@@ -270,284 +320,90 @@ def upload_data():
         return redirect(url_for('admin_analytics'))
     
     if file and (file.filename.endswith('.xlsx') or file.filename.endswith('.csv')):
-        try:
-            # Save the file temporarily
-            file_path = os.path.join('instance', 'temp_data_file')
-            file.save(file_path)
-            
-            # Process the file based on its type
-            if file.filename.endswith('.xlsx'):
-                # Check if pandas is installed
-                try:
-                    import pandas as pd
-                except ImportError:
-                    flash('Pandas library not installed. Please run the install_packages.py script or install manually using "pip install pandas openpyxl".', 'danger')
-                    return redirect(url_for('admin_analytics'))
-                
-                try:
-                    # Check if openpyxl is installed
-                    try:
-                        import openpyxl
-                    except ImportError:
-                        flash('Openpyxl library not installed. Please run the install_packages.py script or install manually using "pip install openpyxl".', 'danger')
-                        return redirect(url_for('admin_analytics'))
-                    
-                    # Helper function to safely convert values to integers
-                    def safe_int(value):
-                        if pd.isna(value) or value == '-' or value == '':
-                            return 0
-                        try:
-                            return int(value)
-                        except (ValueError, TypeError):
-                            return 0
-                    
-                    try:
-                        # Read the Excel file
-                        df = pd.read_excel(file_path)
-                    except Exception as e:
-                        flash(f'Error reading Excel file: {str(e)}. Please check the file format.', 'danger')
-                        return redirect(url_for('admin_analytics'))
-                    
-                    # Check if required columns exist
-                    required_columns = ['Intern Name', 'POC', 'Post']
-                    for col in required_columns:
-                        if col not in df.columns:
-                            raise ValueError(f"Required column '{col}' not found in Excel file")
-                    
-                    # Process each row in the dataframe
-                    for index, row in df.iterrows():
-                        # Skip header or empty rows
-                        if pd.isna(row['Intern Name']) or str(row['Intern Name']).strip() == '' or row['Intern Name'] == 'Intern Name':
-                            continue
-                            
-                        # Get and validate intern name
-                        intern_name = str(row['Intern Name']).strip()
-                        if not intern_name:
-                            continue
-                            
-                        # Check if user exists, create if not
-                        user = User.query.filter_by(name=intern_name).first()
-                        if not user:
-                            email = row.get('Email Id', None)
-                            if pd.isna(email):
-                                email = None
-                            username = email.split('@')[0] if email else intern_name.lower().replace(' ', '.')
-                            # Convert pandas Timestamp to string if needed
-                            doj = row['DOJ']
-                            if isinstance(doj, pd.Timestamp):
-                                doj = doj.strftime('%Y-%m-%d')
-                            
-                            user = User(
-                                username=username,
-                                name=intern_name,
-                                email=email,
-                                role='intern',
-                                post=row['Post'] if not pd.isna(row['Post']) else None,
-                                doj=doj if not pd.isna(row['DOJ']) else None,
-                                reference_number=row['Reference Number'] if not pd.isna(row['Reference Number']) else None,
-                                poc_name=row['POC'] if not pd.isna(row['POC']) else None,
-                                is_poc=False
-                            )
-                            user.set_password('password123')  # Default password
-                            db.session.add(user)
-                            db.session.flush()  # Get user ID without committing
-                        
-                        # Create or update PMS entry
-                        # Convert pandas Timestamp to string if needed
-                        doj = row['DOJ']
-                        if isinstance(doj, pd.Timestamp):
-                            doj = doj.strftime('%Y-%m-%d')
-                            
-                        entry = PMSEntry(
-                            user_id=user.id,
-                            date=datetime.now().date(),
-                            poc=row['POC'] if not pd.isna(row['POC']) else None,
-                            intern_name=intern_name,
-                            post=row['Post'] if not pd.isna(row['Post']) else None,
-                            doj=doj if not pd.isna(row['DOJ']) else None,
-                            reference_number=row['Reference Number'] if not pd.isna(row['Reference Number']) else None,
-                            email_id=email,
-                            total_enrollments=safe_int(row.get('Total Enrollments', 0)),
-                            ms_azure_900=safe_int(row.get('MS Azure 900', 0)),
-                            seo_starter=safe_int(row.get('SEO Starter', 0)),
-                            seo_smm=safe_int(row.get('SEO + SMM', 0)),
-                            dm_crash=safe_int(row.get('DM-Crash', 0)),
-                            job_ready=safe_int(row.get('8Hrs Job Ready', 0)),
-                            azure_combo=safe_int(row.get('Azure Combo', 0)),
-                            recruitment=safe_int(row.get('Recruitment', 0)),
-                            college_db=safe_int(row.get('College DB', 0)),
-                            client_db=safe_int(row.get('Client DB', 0)),
-                            school_lead_db=safe_int(row.get('School Lead DB', 0))
-                        )
-                        db.session.add(entry)
-                    
-                    # Set POC flags for users who are POCs
-                    poc_names = df['POC'].dropna().unique()
-                    for poc_name in poc_names:
-                        poc_user = User.query.filter_by(name=poc_name).first()
-                        if poc_user:
-                            poc_user.is_poc = True
-                    
-                    # Commit all changes
-                    db.session.commit()
-                    flash(f'Excel file processed successfully. {len(df)} records imported.', 'success')
-                    
-                except ImportError:
-                    flash('Pandas library not installed. Please install it to process Excel files.', 'danger')
-                except Exception as e:
-                    db.session.rollback()
-                    flash(f'Error processing Excel file: {str(e)}', 'danger')
-            else:  # CSV file
-                try:
-                    # Helper function to safely convert values to integers
-                    def safe_int(value):
-                        if not value or value == '-' or value == '':
-                            return 0
-                        try:
-                            return int(value)
-                        except (ValueError, TypeError):
-                            return 0
-                            
-                    with open(file_path, 'r', newline='', encoding='utf-8') as csvfile:
-                        reader = csv.DictReader(csvfile)
-                        row_count = 0
-                        
-                        for row in reader:
-                            # Check if user exists, create if not
-                            user = User.query.filter_by(name=row['Intern Name']).first()
-                            if not user:
-                                username = row['Email Id'].split('@')[0] if row['Email Id'] else row['Intern Name'].lower().replace(' ', '.')
-                                user = User(
-                                    username=username,
-                                    name=row['Intern Name'],
-                                    email=row['Email Id'] if row['Email Id'] else None,
-                                    role='intern',
-                                    post=row['Post'] if row['Post'] else None,
-                                    doj=row['DOJ'] if row['DOJ'] else None,
-                                    reference_number=row['Reference Number'] if row['Reference Number'] else None,
-                                    poc_name=row['POC'] if row['POC'] else None,
-                                    is_poc=False
-                                )
-                                user.set_password('password123')  # Default password
-                                db.session.add(user)
-                                db.session.flush()  # Get user ID without committing
-                            
-                            # Create or update PMS entry
-                            entry = PMSEntry(
-                                user_id=user.id,
-                                date=datetime.now().date(),
-                                poc=row['POC'] if row['POC'] else None,
-                                intern_name=row['Intern Name'],
-                                post=row['Post'] if row['Post'] else None,
-                                doj=row['DOJ'] if row['DOJ'] else None,
-                                reference_number=row['Reference Number'] if row['Reference Number'] else None,
-                                email_id=row['Email Id'] if row['Email Id'] else None,
-                                total_enrollments=safe_int(row['Total Enrollments']),
-                                ms_azure_900=safe_int(row['MS Azure 900']),
-                                seo_starter=safe_int(row['SEO Starter']),
-                                seo_smm=safe_int(row['SEO + SMM']),
-                                dm_crash=safe_int(row['DM-Crash']),
-                                job_ready=safe_int(row['8Hrs Job Ready']),
-                                azure_combo=safe_int(row['Azure Combo']),
-                                recruitment=safe_int(row['Recruitment']),
-                                college_db=safe_int(row['College DB']),
-                                client_db=safe_int(row['Client DB']),
-                                school_lead_db=safe_int(row['School Lead DB'])
-                            )
-                            db.session.add(entry)
-                            row_count += 1
-                        
-                        # Set POC flags for users who are POCs
-                        poc_names = set()
-                        csvfile.seek(0)  # Reset file pointer
-                        reader = csv.DictReader(csvfile)
-                        for row in reader:
-                            if row['POC']:
-                                poc_names.add(row['POC'])
-                        
-                        for poc_name in poc_names:
-                            poc_user = User.query.filter_by(name=poc_name).first()
-                            if poc_user:
-                                poc_user.is_poc = True
-                        
-                        # Commit all changes
-                        db.session.commit()
-                        flash(f'CSV file processed successfully. {row_count} records imported.', 'success')
-                        
-                except Exception as e:
-                    db.session.rollback()
-                    flash(f'Error processing CSV file: {str(e)}', 'danger')
-            
-            # Clean up the temporary file
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                
-        except Exception as e:
-            flash(f'Error processing file: {str(e)}', 'danger')
+        if file.filename.endswith('.xlsx'):
+            # Check if openpyxl is installed
+            try:
+                import openpyxl
+            except ImportError:
+                flash('Openpyxl library not installed. Please run the install_packages.py script or install manually using "pip install openpyxl".', 'danger')
+                return redirect(url_for('admin_analytics'))
+        
+        # The upload is read from this request's own spooled buffer and handed to the
+        # job as bytes, so concurrent uploads never share a file
+        data = file.read()
+        data_hash = content_hash(data)
+        
+        # An identical file has already been imported (or is being imported)
+        duplicate = find_duplicate_upload(data_hash)
+        if duplicate:
+            if request.accept_mimetypes.best == 'application/json':
+                return jsonify({'job_id': duplicate.id, 'status_url': url_for('job_status', job_id=duplicate.id),
+                                'duplicate': True}), 200
+            flash(f'{file.filename} is identical to an earlier upload (job #{duplicate.id}); nothing to import.', 'info')
+            return redirect(url_for('admin_analytics'))
+        
+        # Parsing and inserting run in the background job runner, outside the request timeout
+        job = enqueue_job('import', created_by=current_user.id, filename=file.filename, payload=data, data_hash=data_hash)
+        
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({'job_id': job.id, 'status_url': url_for('job_status', job_id=job.id)}), 202
+        
+        flash(f'{file.filename} queued for import (job #{job.id}).', 'info')
+        return redirect(url_for('admin_analytics', job=job.id))
     else:
         flash('Invalid file type. Please upload an Excel (.xlsx) or CSV (.csv) file.', 'danger')
     
     return redirect(url_for('admin_analytics'))
 
-@app.route('/admin/update_all_targets')
+@app.route('/admin/jobs/<int:job_id>')
 @login_required
-def update_all_targets():
+def job_status(job_id):
     if current_user.role != 'admin':
-        flash('Access denied. Admin privileges required.', 'danger')
-        return redirect(url_for('admin_login'))
+        return jsonify({'error': 'Access denied'}), 403
     
-    try:
-        # Update all intern targets
-        interns = User.query.filter_by(role='intern').all()
-        for intern in interns:
-            intern.tnd_total_target = 50  # Set default TND target to 50
-            
-            # You can set other targets based on post or other criteria
-            if intern.post == 'Human Resources':
-                intern.ms_azure_900_target = 10
-                intern.seo_starter_target = 10
-                intern.seo_smm_target = 10
-                intern.dm_crash_target = 10
-                intern.job_ready_target = 5
-                intern.azure_combo_target = 5
-            elif intern.post == 'Business Development':
-                intern.college_db_target = 20
-                intern.client_db_target = 20
-                intern.school_lead_db_target = 10
-            
-        # Commit the changes
-        db.session.commit()
-        
-        flash('All targets have been successfully updated.', 'success')
-    except Exception as e:
-        db.session.rollback()
-        flash(f'Error updating targets: {str(e)}', 'danger')
+    job = db.session.get(BackgroundJob, job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
     
-    return redirect(url_for('admin_analytics'))
+    return jsonify(job_progress(job))
+
+@app.route('/admin/cache_stats')
+@login_required
+def cache_stats():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+    
+    # Counters of this worker process's caches, and of the cache all workers share
+    return jsonify({
+        'user_cache': user_cache.stats(),
+        'view_cache': dict(view_cache.stats(), data_version=data_version()),
+        'shared_cache': shared_cache().stats()
+    })
 
-@app.route('/admin/delete_all_data')
+@app.route('/admin/delete_all_data', methods=['POST'])
 @login_required
 def delete_all_data():
     if current_user.role != 'admin':
         flash('Access denied. Admin privileges required.', 'danger')
         return redirect(url_for('admin_login'))
     
+    # start_date, end_date and post narrow the purge down; scope=all deletes everything
     try:
-        # Delete all PMS entries
-        PMSEntry.query.delete()
-        
-        # Keep admin users but delete all interns
-        User.query.filter_by(role='intern').delete()
-        
-        # Commit the changes
-        db.session.commit()
-        
-        flash('All data has been successfully deleted.', 'success')
-    except Exception as e:
-        db.session.rollback()
-        flash(f'Error deleting data: {str(e)}', 'danger')
+        scope = purge_scope(request.values)
+    except ValueError as e:
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({'error': f'Invalid purge scope: {str(e)}'}), 400
+        flash(f'Invalid purge scope: {str(e)}', 'danger')
+        return redirect(url_for('admin_analytics'))
     
-    return redirect(url_for('admin_analytics'))
+    # Deleting runs in the background, in chunks
+    job = enqueue_job('purge', created_by=current_user.id, params=scope)
+    
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({'job_id': job.id, 'status_url': url_for('job_status', job_id=job.id)}), 202
+    
+    flash(f'Deleting {describe_scope(scope)} in the background (job #{job.id}).', 'info')
+    return redirect(url_for('admin_analytics', job=job.id))
 
 @app.route('/admin/update_all_targets')
 @login_required
@@ -557,31 +413,16 @@ def update_all_targets():
         return redirect(url_for('admin_login'))
     
     try:
-        # Get all interns
-        interns = User.query.filter_by(role='intern').all()
-        
-        for intern in interns:
-            # Set TND total target to 10 for all interns
-            intern.tnd_total_target = 10
-            
-            # Set Category targets based on post
-            if intern.post == 'Human Resources':
-                # HR Interns: 10, 10, 5, 50
-                intern.recruitment_target = 10
-                intern.college_db_target = 10
-                intern.client_db_target = 5
-                intern.school_lead_db_target = 50
-            else:
-                # Other Interns: 0, 10, 5, 50
-                intern.recruitment_target = 0
-                intern.college_db_target = 10
-                intern.client_db_target = 5
-                intern.school_lead_db_target = 50
+        # Apply the target rules to every intern in one statement
+        seed_target_rules()
+        updated = apply_target_rules()
         
         # Commit changes
         db.session.commit()
+        forget_users()
+        bump_data_version()
         
-        flash(f'Updated targets for {len(interns)} interns.', 'success')
+        flash(f'Updated targets for {updated} interns.', 'success')
     except Exception as e:
         db.session.rollback()
         flash(f'Error updating targets: {str(e)}', 'danger')
@@ -595,10 +436,7 @@ def team_management():
         flash('Access denied. Admin privileges required.', 'danger')
         return redirect(url_for('admin_login'))
     
-    # Get all interns
-    interns = User.query.filter_by(role='intern').all()
-    
-    return render_template('team_management.html', interns=interns)
+    return render_template('team_management.html')
 
 @app.route('/admin/manage_targets')
 @login_required
@@ -619,46 +457,27 @@ def save_targets():
         flash('Access denied. Admin privileges required.', 'danger')
         return redirect(url_for('admin_login'))
     
-    # Get all interns
-    interns = User.query.filter_by(role='intern').all()
-    
-    for intern in interns:
-        # Get TND target values from form
-        target = request.form.get(f'target_{intern.id}', type=int) or 0
-        tnd_total_target = request.form.get(f'tnd_total_target_{intern.id}', type=int) or 10
-        ms_azure_900_target = request.form.get(f'ms_azure_900_target_{intern.id}', type=int) or 0
-        seo_starter_target = request.form.get(f'seo_starter_target_{intern.id}', type=int) or 0
-        seo_smm_target = request.form.get(f'seo_smm_target_{intern.id}', type=int) or 0
-        dm_crash_target = request.form.get(f'dm_crash_target_{intern.id}', type=int) or 0
-        job_ready_target = request.form.get(f'job_ready_target_{intern.id}', type=int) or 0
-        azure_combo_target = request.form.get(f'azure_combo_target_{intern.id}', type=int) or 0
-        
-        # Get Category target values from form
-        recruitment_target = request.form.get(f'recruitment_target_{intern.id}', type=int) or 0
-        college_db_target = request.form.get(f'college_db_target_{intern.id}', type=int) or 0
-        client_db_target = request.form.get(f'client_db_target_{intern.id}', type=int) or 0
-        school_lead_db_target = request.form.get(f'school_lead_db_target_{intern.id}', type=int) or 0
-        
-        # Update TND targets
-        intern.target = target
-        intern.tnd_total_target = tnd_total_target
-        intern.ms_azure_900_target = ms_azure_900_target
-        intern.seo_starter_target = seo_starter_target
-        intern.seo_smm_target = seo_smm_target
-        intern.dm_crash_target = dm_crash_target
-        intern.job_ready_target = job_ready_target
-        intern.azure_combo_target = azure_combo_target
-        
-        # Update Category targets
-        intern.recruitment_target = recruitment_target
-        intern.college_db_target = college_db_target
-        intern.client_db_target = client_db_target
-        intern.school_lead_db_target = school_lead_db_target
-    
-    # Save changes
+    # Only cells that differ from the stored targets are written, in one statement
+    try:
+        if request.is_json:
+            changes = parse_target_json(request.get_json())
+        else:
+            changes = parse_target_form(request.form)
+    except (ValueError, TypeError, AttributeError) as e:
+        if request.is_json:
+            return jsonify({'error': f'Invalid targets: {str(e)}'}), 400
+        flash(f'Invalid targets: {str(e)}', 'danger')
+        return redirect(url_for('manage_targets'))
+    
+    summary = apply_target_changes(changes)
     db.session.commit()
+    forget_users(summary['changes'])
+    bump_data_version()
+    
+    if request.is_json:
+        return jsonify(summary)
     
-    flash('Targets updated successfully', 'success')
+    flash(f"Targets updated successfully ({summary['interns_updated']} interns changed)", 'success')
     return redirect(url_for('manage_targets'))
 
 @app.route('/admin/manage_intern_numbers')
@@ -671,7 +490,7 @@ def manage_intern_numbers():
     # Get all interns
     interns = User.query.filter_by(role='intern').all()
     
-    return render_template('update_intern_numbers.html', interns=interns)
+    return render_template('update_intern_numbers.html', interns=interns, latest_entries=latest_entries())
 
 @app.route('/admin/view_intern/<int:intern_id>')
 @login_required
@@ -684,7 +503,7 @@ def view_intern(intern_id):
     intern = User.query.get_or_404(intern_id)
     
     # Get all entries for this intern
-    entries = PMSEntry.query.filter_by(user_id=intern_id).order_by(PMSEntry.date.desc()).all()
+    entries = filtered_entries({'user_id': intern_id}).order_by(PMSEntry.date.desc()).all()
     
     return render_template('view_intern.html', intern=intern, entries=entries)
 
@@ -699,52 +518,43 @@ def save_intern_numbers():
     interns = User.query.filter_by(role='intern').all()
     today = date.today()
     
+    # Today's admin-entered numbers (entries without a section), fetched in one query
+    current = {user_id: values for user_id, *values in admin_numbers(today, INTERN_NUMBER_FIELDS)}
+    
+    rows = []
     for intern in interns:
         # Get values from form
-        total_enrollments = request.form.get(f'total_enrollments_{intern.id}', type=int) or 0
-        ms_azure_900 = request.form.get(f'ms_azure_900_{intern.id}', type=int) or 0
-        seo_starter = request.form.get(f'seo_starter_{intern.id}', type=int) or 0
-        seo_smm = request.form.get(f'seo_smm_{intern.id}', type=int) or 0
-        dm_crash = request.form.get(f'dm_crash_{intern.id}', type=int) or 0
-        job_ready = request.form.get(f'job_ready_{intern.id}', type=int) or 0
-        azure_combo = request.form.get(f'azure_combo_{intern.id}', type=int) or 0
-        recruitment = request.form.get(f'recruitment_{intern.id}', type=int) or 0
-        college_db = request.form.get(f'college_db_{intern.id}', type=int) or 0
-        client_db = request.form.get(f'client_db_{intern.id}', type=int) or 0
-        school_lead_db = request.form.get(f'school_lead_db_{intern.id}', type=int) or 0
-        
-        # Check if entry exists for today
-        entry = PMSEntry.query.filter_by(user_id=intern.id, date=today).first()
+        values = [request.form.get(f'{field}_{intern.id}', type=int) or 0 for field in INTERN_NUMBER_FIELDS]
         
-        # If entry doesn't exist, create a new one
-        if not entry:
-            entry = PMSEntry(
-                user_id=intern.id,
-                date=today,
-                poc=intern.poc_name,
-                intern_name=intern.name,
-                post=intern.post,
-                doj=intern.doj,
-                reference_number=intern.reference_number,
-                email_id=intern.email
-            )
-            db.session.add(entry)
+        # Nothing to write if today's entry already holds these numbers
+        if current.get(intern.id) == values:
+            continue
         
-        # Update entry fields
-        entry.total_enrollments = total_enrollments
-        entry.ms_azure_900 = ms_azure_900
-        entry.seo_starter = seo_starter
-        entry.seo_smm = seo_smm
-        entry.dm_crash = dm_crash
-        entry.job_ready = job_ready
-        entry.azure_combo = azure_combo
-        entry.recruitment = recruitment
-        entry.college_db = college_db
-        entry.client_db = client_db
-        entry.school_lead_db = school_lead_db
+        # Profile fields are only used when today's entry is created
+        row = {
+            'user_id': intern.id,
+            'date': today,
+            'section': None,
+            'poc': intern.poc_name,
+            'intern_name': intern.name,
+            'post': intern.post,
+            'doj': intern.doj,
+            'reference_number': intern.reference_number,
+            'email_id': intern.email
+        }
+        row.update(zip(INTERN_NUMBER_FIELDS, values))
+        rows.append(row)
+    
+    # Create or update today's entries in a single INSERT ... ON CONFLICT statement
+    upsert_entries(rows, INTERN_NUMBER_FIELDS)
+    
+    # Keep the daily rollup in step with today's numbers
+    days = refresh_rollups({(row['user_id'], today) for row in rows})
     
     # Save changes
     db.session.commit()
+    invalidate_buckets(days)
+    bump_data_version()
     
     flash('Intern numbers updated successfully', 'success')
     return redirect(url_for('manage_intern_numbers'))
@@ -784,6 +594,7 @@ def add_user():
         
         db.session.add(user)
         db.session.commit()
+        bump_data_version()
         
         flash('User added successfully', 'success')
         return redirect(url_for('manage_users'))
@@ -809,6 +620,8 @@ def edit_user(user_id):
             user.set_password(request.form.get('password'))
         
         db.session.commit()
+        forget_users([user.id])
+        bump_data_version()
         flash('User updated successfully', 'success')
         return redirect(url_for('manage_users'))
     
@@ -827,8 +640,16 @@ def delete_user(user_id):
         flash('Cannot delete admin user', 'danger')
         return redirect(url_for('manage_users'))
     
+    # The intern's entries and rollups go first, in committed chunks; deleting the
+    # user with entries left would set their (NOT NULL) user_id to NULL
+    delete_in_chunks(PMSEntry, [PMSEntry.user_id == user_id])
+    delete_in_chunks(PMSDailyRollup, [PMSDailyRollup.user_id == user_id])
+    forget_uploads()
     db.session.delete(user)
     db.session.commit()
+    invalidate_buckets()
+    forget_users([user_id])
+    bump_data_version()
     
     flash('User deleted successfully', 'success')
     return redirect(url_for('manage_users'))
@@ -841,31 +662,60 @@ def admin_reports():
         return redirect(url_for('index'))
     
     # Get filter parameters
-    user_id = request.args.get('user_id', type=int)
-    section = request.args.get('section')
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
-    
-    # Base query
-    query = PMSEntry.query
-    
-    # Apply filters
-    if user_id:
-        query = query.filter_by(user_id=user_id)
-    if section:
-        query = query.filter_by(section=section)
-    if start_date:
-        query = query.filter(PMSEntry.date >= datetime.strptime(start_date, '%Y-%m-%d').date())
-    if end_date:
-        query = query.filter(PMSEntry.date <= datetime.strptime(end_date, '%Y-%m-%d').date())
-    
-    # Get entries
-    entries = query.order_by(PMSEntry.date.desc()).all()
+    filters = report_filters(request.args)
+    query = filtered_entries(filters)
+    
+    # One page of entries, located by (date, id) cursor rather than offset
+    page_size = max(1, min(request.args.get('per_page', type=int) or app.config.get('REPORTS_PAGE_SIZE', DEFAULT_PAGE_SIZE),
+                           MAX_PAGE_SIZE))
+    entries, older_cursor, newer_cursor = report_page(
+        query,
+        page_size,
+        after=request.args.get('after'),
+        before=request.args.get('before')
+    )
+    
+    # Count and totals over every matching entry
+    summary = report_summary(query)
     
     # Get all interns for filter dropdown
     interns = User.query.filter_by(role='intern').all()
     
-    return render_template('admin_reports.html', entries=entries, interns=interns, sections=SECTIONS)
+    return render_template('admin_reports.html',
+                           entries=entries,
+                           interns=interns,
+                           sections=SECTIONS,
+                           filters=filters,
+                           summary=summary,
+                           older_cursor=older_cursor,
+                           newer_cursor=newer_cursor)
+
+@app.route('/admin/reports/export')
+@login_required
+def export_reports():
+    if current_user.role != 'admin':
+        flash('Access denied. Admin privileges required.', 'danger')
+        return redirect(url_for('index'))
+    
+    # Same filters as the reports page
+    filters = report_filters(request.args)
+    rows = export_rows(filtered_entries(filters))
+    filename = f"pms_report_{date.today().strftime('%Y-%m-%d')}"
+    
+    if request.args.get('format') == 'xlsx':
+        try:
+            import openpyxl
+        except ImportError:
+            flash('Openpyxl library not installed. Please run the install_packages.py script or install manually using "pip install openpyxl".', 'danger')
+            return redirect(url_for('admin_reports', **filters))
+        
+        return Response(stream_with_context(xlsx_chunks(rows)),
+                        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                        headers={'Content-Disposition': f'attachment; filename={filename}.xlsx'})
+    
+    return Response(stream_with_context(csv_chunks(rows)),
+                    mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename={filename}.csv'})
 
 @app.route('/intern/dashboard')
 @login_required
@@ -876,7 +726,7 @@ def intern_dashboard():
     
     # Get today's entries for the current user
     today = date.today()
-    today_entries = PMSEntry.query.filter_by(user_id=current_user.id, date=today).all()
+    today_entries = day_entries(today, current_user.id).all()
     
     # Create a dictionary to store entries by section
     entries_by_section = {section: None for section in SECTIONS}
@@ -889,10 +739,19 @@ def intern_dashboard():
     # Get all interns for team structure
     interns = User.query.filter_by(role='intern').all()
     
+    # Enrollments today and this month against the intern's targets; the charts load from intern_chart
+    kpis = intern_kpis(current_user.id)
+    today_progress = progress_percent(kpis['day']['achieved']['total_enrollments'][-1],
+                                      kpis['day']['targets']['total_enrollments'])
+    month_progress = progress_percent(kpis['month']['achieved']['total_enrollments'][-1],
+                                      kpis['month']['targets']['total_enrollments'])
+    
     return render_template('dashboard.html', 
                            entries_by_section=entries_by_section, 
                            sections=SECTIONS,
-                           interns=interns)
+                           interns=interns,
+                           today_progress=today_progress,
+                           month_progress=month_progress)
 
 @app.route('/intern/update_pms', methods=['POST'])
 @login_required
@@ -910,11 +769,7 @@ def update_pms():
     today = date.today()
     
     # Check if entry already exists for today and this section
-    entry = PMSEntry.query.filter_by(
-        user_id=current_user.id,
-        date=today,
-        section=section
-    ).first()
+    entry = section_entry(current_user.id, today, section).first()
     
     # If entry doesn't exist, create a new one
     if not entry:
@@ -938,7 +793,12 @@ def update_pms():
     entry.client_db = request.form.get('client_db', type=int) or 0
     entry.school_lead_db = request.form.get('school_lead_db', type=int) or 0
     
+    # Keep the daily rollup in step with this entry
+    days = refresh_rollups(touched_keys([entry]))
+    
     db.session.commit()
+    invalidate_buckets(days)
+    bump_data_version()
     
     flash(f'{section} data updated successfully', 'success')
     return redirect(url_for('intern_dashboard'))
@@ -950,23 +810,9 @@ def intern_history():
         flash('Access denied. Intern privileges required.', 'danger')
         return redirect(url_for('intern_login'))
     
-    # Get filter parameters
-    section = request.args.get('section')
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
-    
-    # Base query for current user's entries
-    query = PMSEntry.query.filter_by(user_id=current_user.id)
-    
-    # Apply filters
-    if section:
-        query = query.filter_by(section=section)
-    if start_date:
-        query = query.filter(PMSEntry.date >= datetime.strptime(start_date, '%Y-%m-%d').date())
-    if end_date:
-        query = query.filter(PMSEntry.date <= datetime.strptime(end_date, '%Y-%m-%d').date())
-    
-    # Get entries
-    entries = query.order_by(PMSEntry.date.desc()).all()
+    # The current user's entries, with the same section and date filters as the reports
+    filters = report_filters(request.args)
+    filters['user_id'] = current_user.id
+    entries = filtered_entries(filters).order_by(PMSEntry.date.desc()).all()
     
     return render_template('intern_history.html', entries=entries, sections=SECTIONS)
\ No newline at end of file
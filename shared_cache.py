@@ -0,0 +1,191 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from flask import current_app
+
+# Cache shared by the gunicorn workers of one machine: an SQLite file on local
+# disk, so it needs no extra service. Values are plain data (dicts, lists,
+# strings, numbers), stored as JSON with a version; a read only hits when the stored version is the one asked for, so
+# moving a version on (see view_cache.bump_data_version) invalidates an entry
+# for every worker at once, and delete()/delete_prefix() drop entries for all
+# of them atomically. The file is disposable and can be removed at any time.
+# JSON dict keys are always strings, so callers caching dicts keyed by
+# anything else convert the keys back on read.
+
+# Bytes of stored values kept; the oldest entries go first beyond this
+SHARED_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Returned by get() when there is no entry of the requested version
+MISSING = object()
+
+# Stored as PRAGMA user_version; files written with another layout are emptied on open
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entry (
+    key TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cache_stat (
+    key TEXT PRIMARY KEY,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS cache_build (
+    key TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+class SharedCache:
+    """Versioned key/value store in an SQLite file, safe across threads and processes.
+
+    Each thread of each process uses its own connection. Lookups count per-key
+    hits and misses in the file itself, so stats() covers every worker.
+    """
+
+    def __init__(self, path, max_bytes=SHARED_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+    def _connection(self):
+        # Connections are not carried across a fork
+        if getattr(self._local, 'pid', None) != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            if connection.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                # Older files held pickled values
+                connection.executescript('DROP TABLE IF EXISTS cache_entry;'
+                                         f'PRAGMA user_version = {SCHEMA_VERSION};')
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    def count(self, key, hit):
+        # Record a hit or miss on `key` for stats()
+        column = 'hits' if hit else 'misses'
+        self._connection().execute(
+            f'INSERT INTO cache_stat (key, {column}) VALUES (?, 1) '
+            f'ON CONFLICT (key) DO UPDATE SET {column} = {column} + 1', (key,))
+
+    def peek(self, key, version=0, default=MISSING):
+        # get() without counting a hit or miss
+        row = self._connection().execute(
+            'SELECT value FROM cache_entry WHERE key = ? AND version = ?', (key, version)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def get(self, key, version=0, default=MISSING):
+        value = self.peek(key, version)
+        self.count(key, value is not MISSING)
+        return default if value is MISSING else value
+
+    def set(self, key, version, value):
+        # Store `value` unless a newer version of `key` is stored already
+        data = json.dumps(value, separators=(',', ':'))
+        connection = self._connection()
+        connection.execute(
+            'INSERT INTO cache_entry (key, version, value, size, stored_at) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET version = excluded.version, value = excluded.value, '
+            'size = excluded.size, stored_at = excluded.stored_at WHERE excluded.version >= cache_entry.version',
+            (key, version, data, len(data), time.time()))
+        self._evict(connection)
+
+    def _evict(self, connection):
+        total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM cache_entry').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        stale = []
+        for key, size in connection.execute('SELECT key, size FROM cache_entry ORDER BY stored_at'):
+            stale.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        connection.executemany('DELETE FROM cache_entry WHERE key = ?', stale)
+        connection.executemany('DELETE FROM cache_stat WHERE key = ?', stale)
+
+    # Hit and miss counts go with their entries, so per-day and per-user keys don't pile up
+
+    def delete(self, keys):
+        keys = [(key,) for key in keys]
+        connection = self._connection()
+        connection.executemany('DELETE FROM cache_entry WHERE key = ?', keys)
+        connection.executemany('DELETE FROM cache_stat WHERE key = ?', keys)
+
+    def delete_prefix(self, prefix):
+        connection = self._connection()
+        for table in ('cache_entry', 'cache_stat'):
+            connection.execute(f'DELETE FROM {table} WHERE substr(key, 1, ?) = ?', (len(prefix), prefix))
+
+    def claim_build(self, key, version, timeout):
+        """Claim the right to build `version` of `key` for `timeout` seconds.
+
+        Returns False while another process holds an unexpired claim on the
+        same or a newer version; it will store the value shortly.
+        """
+        connection = self._connection()
+        now = time.time()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(
+                'SELECT version, expires_at FROM cache_build WHERE key = ?', (key,)).fetchone()
+            if row and row[0] >= version and row[1] > now:
+                return False
+            connection.execute(
+                'INSERT OR REPLACE INTO cache_build (key, version, expires_at) VALUES (?, ?, ?)',
+                (key, version, now + timeout))
+            return True
+        finally:
+            connection.execute('COMMIT')
+
+    def release_build(self, key, version):
+        self._connection().execute('DELETE FROM cache_build WHERE key = ? AND version = ?', (key, version))
+
+    def stats(self):
+        connection = self._connection()
+        keys = {}
+        for key, version, size, stored_at in connection.execute(
+                'SELECT key, version, size, stored_at FROM cache_entry'):
+            keys[key] = {'version': version, 'bytes': size, 'stored_at': stored_at, 'hits': 0, 'misses': 0}
+        for key, hits, misses in connection.execute('SELECT key, hits, misses FROM cache_stat'):
+            entry = keys.setdefault(key, {'version': None, 'bytes': 0, 'stored_at': None})
+            entry.update(hits=hits, misses=misses)
+        for entry in keys.values():
+            lookups = entry['hits'] + entry['misses']
+            entry['hit_rate'] = round(entry['hits'] / lookups, 4) if lookups else None
+
+        file_bytes = sum(os.path.getsize(path) for path in (self.path, self.path + '-wal')
+                         if os.path.exists(path))
+        return {
+            'path': self.path,
+            'entries': sum(1 for entry in keys.values() if entry['version'] is not None),
+            'value_bytes': sum(entry['bytes'] for entry in keys.values()),
+            'max_bytes': self.max_bytes,
+            'file_bytes': file_bytes,
+            'keys': dict(sorted(keys.items()))
+        }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def shared_cache():
+    # The current app's SharedCache, at SHARED_CACHE_PATH (default: instance/shared_cache.db)
+    path = current_app.config.get('SHARED_CACHE_PATH') or os.path.join(current_app.instance_path, 'shared_cache.db')
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = SharedCache(path)
+        return _caches[path]
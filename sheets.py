@@ -0,0 +1,321 @@
+import csv
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from multiprocessing import get_context
+
+# Reading and normalizing uploaded sheets. Nothing here touches the database,
+# so sheets can be parsed in worker processes (see workbook_chunks).
+
+# Upload column -> PMSEntry metric
+METRIC_COLUMNS = {
+    'Total Enrollments': 'total_enrollments',
+    'MS Azure 900': 'ms_azure_900',
+    'SEO Starter': 'seo_starter',
+    'SEO + SMM': 'seo_smm',
+    'DM-Crash': 'dm_crash',
+    '8Hrs Job Ready': 'job_ready',
+    'Azure Combo': 'azure_combo',
+    'Recruitment': 'recruitment',
+    'College DB': 'college_db',
+    'Client DB': 'client_db',
+    'School Lead DB': 'school_lead_db'
+}
+
+# Columns a raw data sheet must have
+REQUIRED_COLUMNS = ['Intern Name', 'POC', 'Post']
+
+# Row labels on a snapshot sheet -> upload column
+SNAPSHOT_LABELS = {
+    'MS Azure 900': 'MS Azure 900',
+    'SEO Starter': 'SEO Starter',
+    'SEO + SMM': 'SEO + SMM',
+    'DM-Crash': 'DM-Crash',
+    '8Hrs Job Ready': '8Hrs Job Ready',
+    'Azure Combo': 'Azure Combo',
+    'Total Enrollments': 'Total Enrollments',
+    'Recruitments': 'Recruitment',
+    'College Collaborations': 'College DB',
+    'Client Collaborations': 'Client DB',
+    'School Database Lead Generation': 'School Lead DB'
+}
+
+# Cells heading a block of per-intern totals on a snapshot sheet (intern names run to the right)
+SNAPSHOT_BLOCKS = ['TND', 'Category']
+
+# Sheet layouts of the PMS workbook template; sheets with other names are detected
+SHEET_SCHEMAS = {
+    'Raw Data': 'raw',
+    'Snapshot': 'snapshot'
+}
+
+# Rows searched for a raw sheet's header
+HEADER_SEARCH_ROWS = 10
+
+# Uploaded rows normalized per chunk
+IMPORT_CHUNK_SIZE = 1000
+
+
+def clean(value):
+    # Empty cells (None, NaN/NaT, '') become None; dates become YYYY-MM-DD strings
+    if value is None or value != value:
+        return None
+    if isinstance(value, (datetime, date)):
+        return value.strftime('%Y-%m-%d')
+    value = str(value).strip()
+    return value or None
+
+
+def safe_int(value):
+    value = clean(value)
+    if value is None:
+        return 0
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return int(float(value))
+        except ValueError:
+            return 0
+
+
+def normalize_row(raw):
+    """Turn one uploaded row into typed intern and metric fields.
+
+    Returns None for rows without an intern name, including repeated header rows.
+    """
+    intern_name = clean(raw.get('Intern Name'))
+    if not intern_name or intern_name == 'Intern Name':
+        return None
+
+    row = {
+        'intern_name': intern_name,
+        'poc': clean(raw.get('POC')),
+        'post': clean(raw.get('Post')),
+        'doj': clean(raw.get('DOJ')),
+        'reference_number': clean(raw.get('Reference Number')),
+        'email_id': clean(raw.get('Email Id'))
+    }
+    for column, metric in METRIC_COLUMNS.items():
+        row[metric] = safe_int(raw.get(column))
+    return row
+
+
+def normalized_chunks(raw_rows, first_row=2, sheet=None, size=IMPORT_CHUNK_SIZE):
+    """Yield (normalized rows, skipped rows) for every `size` uploaded rows.
+
+    Skipped rows are labels such as 'Raw Data row 36' for rows that have
+    values but no intern name; blank rows are ignored. `first_row` is the
+    sheet row number of the first raw row.
+    """
+    prefix = f'{sheet} row' if sheet else 'Row'
+    rows = []
+    skipped = []
+    for number, raw in enumerate(raw_rows, first_row):
+        row = normalize_row(raw)
+        if row:
+            rows.append(row)
+        elif any(clean(value) is not None for value in raw.values()):
+            skipped.append(f'{prefix} {number}')
+        if len(rows) + len(skipped) >= size:
+            yield rows, skipped
+            rows = []
+            skipped = []
+    if rows or skipped:
+        yield rows, skipped
+
+
+def _missing_columns(place):
+    missing = ', '.join(f"'{col}'" for col in REQUIRED_COLUMNS)
+    return f"Required columns {missing} not found in {place}"
+
+
+def iter_csv_rows(file):
+    # `file` is a path or a binary file object
+    if isinstance(file, str):
+        with open(file, 'r', newline='', encoding='utf-8') as csvfile:
+            yield from csv.DictReader(csvfile)
+    else:
+        yield from csv.DictReader(io.TextIOWrapper(file, encoding='utf-8', newline=''))
+
+
+def _header_index(rows):
+    # Index of the row holding all REQUIRED_COLUMNS, or None
+    for index, values in enumerate(rows):
+        cells = {str(value).strip() for value in values if value is not None}
+        if all(col in cells for col in REQUIRED_COLUMNS):
+            return index
+    return None
+
+
+def sheet_schema(sheet):
+    # 'raw', 'snapshot' or None (not importable) for a worksheet
+    if sheet.title in SHEET_SCHEMAS:
+        return SHEET_SCHEMAS[sheet.title]
+
+    preview = list(sheet.iter_rows(max_row=HEADER_SEARCH_ROWS, values_only=True))
+    if _header_index(preview) is not None:
+        return 'raw'
+    if any(value in SNAPSHOT_BLOCKS for values in preview for value in values):
+        return 'snapshot'
+    return None
+
+
+def raw_sheet_chunks(sheet):
+    """Normalized chunks of a raw data sheet: one header row, then one row per intern.
+
+    The header may sit below a row of group titles, so the first
+    HEADER_SEARCH_ROWS rows are searched for it. Rows are streamed.
+    """
+    rows = sheet.iter_rows(values_only=True)
+    preview = []
+    for values in rows:
+        preview.append(values)
+        if len(preview) == HEADER_SEARCH_ROWS or _header_index(preview[-1:]) is not None:
+            break
+
+    header_index = _header_index(preview)
+    if header_index is None:
+        raise ValueError(_missing_columns(f"sheet '{sheet.title}'"))
+
+    header = [str(cell).strip() if cell is not None else '' for cell in preview[header_index]]
+    raw_rows = (dict(zip(header, values)) for values in rows)
+    return normalized_chunks(raw_rows, first_row=header_index + 2, sheet=sheet.title)
+
+
+def snapshot_sheet_chunks(sheet):
+    """Normalized chunks of a snapshot sheet: blocks of per-intern totals.
+
+    Each block starts with a SNAPSHOT_BLOCKS cell with intern names to its
+    right, followed by one labelled row per metric. An intern's blocks are
+    merged into one row; interns without data keep zero for other metrics.
+    """
+    grid = [list(values) for values in sheet.iter_rows(values_only=True)]
+    totals = {}
+    for top, values in enumerate(grid):
+        for left, value in enumerate(values):
+            if value not in SNAPSHOT_BLOCKS:
+                continue
+
+            # Intern names run right until the first empty cell
+            names = {}
+            for column in range(left + 1, len(values)):
+                name = clean(values[column])
+                if name is None:
+                    break
+                names[column] = name
+
+            # Metric rows run down until the first empty label
+            for row in grid[top + 1:]:
+                label = clean(row[left]) if left < len(row) else None
+                if label is None:
+                    break
+                if label not in SNAPSHOT_LABELS:
+                    continue
+                for column, name in names.items():
+                    totals.setdefault(name, {'Intern Name': name})[SNAPSHOT_LABELS[label]] = row[column]
+
+    rows = [normalize_row(raw) for raw in totals.values()]
+    for start in range(0, len(rows), IMPORT_CHUNK_SIZE):
+        yield rows[start:start + IMPORT_CHUNK_SIZE], []
+
+
+def sheet_chunks(sheet, schema):
+    if schema == 'raw':
+        return raw_sheet_chunks(sheet)
+    return snapshot_sheet_chunks(sheet)
+
+
+def _open_workbook(data):
+    from openpyxl import load_workbook
+
+    # Read-only workbooks stream each sheet's XML instead of loading it
+    return load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+
+
+def parse_sheet(data, sheet_name, schema):
+    # Process pool task: all normalized chunks of one (small) sheet
+    workbook = _open_workbook(data)
+    try:
+        return list(sheet_chunks(workbook[sheet_name], schema))
+    finally:
+        workbook.close()
+
+
+def _merge_sheets(sheet_chunks):
+    """Combine (schema, chunks) per sheet into one stream of chunks.
+
+    Raw data sheets list every intern's row; snapshot totals are only used for
+    interns that no raw data sheet lists, so nobody is imported twice.
+    """
+    seen = set()
+    snapshots = []
+    for schema, chunks in sheet_chunks:
+        if schema == 'snapshot':
+            snapshots.append(chunks)
+            continue
+        for rows, skipped in chunks:
+            seen.update(row['intern_name'] for row in rows)
+            yield rows, skipped
+
+    for chunks in snapshots:
+        for rows, skipped in chunks:
+            rows = [row for row in rows if row['intern_name'] not in seen]
+            seen.update(row['intern_name'] for row in rows)
+            if rows or skipped:
+                yield rows, skipped
+
+
+def workbook_chunks(data):
+    """Yield normalized chunks for every importable sheet of an .xlsx upload.
+
+    The largest raw data sheet is streamed in this process, so the caller
+    writes its first chunks while the rest is still being read. Any other
+    sheets (the snapshot, extra raw sheets) are parsed meanwhile in a process
+    pool, or streamed here too when there is a single CPU. Raw chunks are
+    yielded in workbook order, so a later row for an intern deterministically
+    replaces an earlier one.
+    """
+    workbook = _open_workbook(data)
+    try:
+        sheets = [(sheet.title, sheet_schema(sheet)) for sheet in workbook.worksheets]
+        sheets = [(name, schema) for name, schema in sheets if schema]
+        if not sheets:
+            raise ValueError("No sheet with the required columns found in Excel file")
+
+        # max_row comes from the sheet's stored dimensions, and may be missing
+        raw = [name for name, schema in sheets if schema == 'raw'] or [sheets[0][0]]
+        streamed = max(raw, key=lambda name: workbook[name].max_row or 0)
+        pooled = [(name, schema) for name, schema in sheets if name != streamed]
+
+        workers = min(len(pooled), (os.cpu_count() or 1) - 1)
+        if workers < 1:
+            yield from _merge_sheets((schema, sheet_chunks(workbook[name], schema)) for name, schema in sheets)
+            return
+
+        # Spawned workers only import this module, and nothing is inherited from the
+        # threads of the process running the import
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn')) as executor:
+            futures = {name: executor.submit(parse_sheet, data, name, schema) for name, schema in pooled}
+            yield from _merge_sheets(
+                (schema, sheet_chunks(workbook[name], schema) if name == streamed else futures[name].result())
+                for name, schema in sheets)
+    finally:
+        workbook.close()
+
+
+def csv_chunks(data):
+    # Normalized chunks of an uploaded CSV file, which must have REQUIRED_COLUMNS in its header
+    reader = csv.DictReader(io.TextIOWrapper(io.BytesIO(data), encoding='utf-8', newline=''))
+    reader.fieldnames = [name.strip() for name in reader.fieldnames or []]
+    if not all(col in reader.fieldnames for col in REQUIRED_COLUMNS):
+        raise ValueError(_missing_columns('CSV file'))
+    return normalized_chunks(reader)
+
+
+def upload_chunks(filename, data):
+    # Normalized chunks of an uploaded .xlsx or .csv file held in memory
+    if filename.endswith('.xlsx'):
+        return workbook_chunks(data)
+    return csv_chunks(data)
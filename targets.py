@@ -0,0 +1,138 @@
+from sqlalchemy import case
+from models import db, User, TargetRule, in_chunks
+
+# Target columns edited on /admin/manage_targets -> value stored when a cell is left empty or zero
+TARGET_FIELDS = {
+    'target': 0,
+    'tnd_total_target': 10,
+    'ms_azure_900_target': 0,
+    'seo_starter_target': 0,
+    'seo_smm_target': 0,
+    'dm_crash_target': 0,
+    'job_ready_target': 0,
+    'azure_combo_target': 0,
+    'recruitment_target': 0,
+    'college_db_target': 0,
+    'client_db_target': 0,
+    'school_lead_db_target': 0
+}
+
+# Rules stored by seed_target_rules() when the table is empty: (post or None for every other post, field, value)
+DEFAULT_TARGET_RULES = [
+    (None, 'tnd_total_target', 10),
+    (None, 'recruitment_target', 0),
+    (None, 'college_db_target', 10),
+    (None, 'client_db_target', 5),
+    (None, 'school_lead_db_target', 50),
+    ('Human Resources', 'recruitment_target', 10)
+]
+
+def _target_value(field, value):
+    # Form and JSON values as stored; raises ValueError for non-numbers
+    value = int(value) if value not in (None, '') else 0
+    return value or TARGET_FIELDS[field]
+
+
+def parse_target_form(form):
+    """Collect {intern id: {field: value}} from `<field>_<intern id>` form inputs.
+
+    Only the inputs present in the form are returned, so a form that submits
+    just its edited cells yields just those.
+    """
+    changes = {}
+    for key, value in form.items():
+        field, _, intern_id = key.rpartition('_')
+        if field in TARGET_FIELDS and intern_id.isdigit():
+            try:
+                changes.setdefault(int(intern_id), {})[field] = _target_value(field, value)
+            except ValueError:
+                continue
+    return changes
+
+
+def parse_target_json(payload):
+    # Same as parse_target_form for a {"changes": {"<intern id>": {"<field>": value}}} body
+    changes = {}
+    for intern_id, fields in (payload.get('changes') or {}).items():
+        for field, value in fields.items():
+            if field not in TARGET_FIELDS:
+                raise ValueError(f"Unknown target field '{field}'")
+            changes.setdefault(int(intern_id), {})[field] = _target_value(field, value)
+    return changes
+
+
+def apply_target_changes(changes):
+    """Write the cells of `changes` that differ from the stored targets.
+
+    The current targets of the interns involved are read in one query and
+    every changed intern is written by a single executemany UPDATE (each
+    row sets all target columns, so they share one statement). The caller
+    commits. Returns a summary including the cells that actually changed.
+    """
+    columns = [getattr(User, field) for field in TARGET_FIELDS]
+    current = {}
+    for chunk in in_chunks(changes):
+        rows = db.session.query(User.id, *columns).filter(User.role == 'intern', User.id.in_(chunk))
+        for user_id, *values in rows:
+            current[user_id] = dict(zip(TARGET_FIELDS, values))
+
+    updates = []
+    changed = {}
+    for user_id, fields in changes.items():
+        if user_id not in current:
+            continue
+        diff = {field: value for field, value in fields.items() if current[user_id][field] != value}
+        if diff:
+            changed[user_id] = diff
+            updates.append(dict(current[user_id], id=user_id, **diff))
+
+    if updates:
+        db.session.bulk_update_mappings(User, updates)
+
+    cells_updated = sum(len(diff) for diff in changed.values())
+    return {
+        'interns_updated': len(changed),
+        'cells_updated': cells_updated,
+        'cells_unchanged': sum(len(fields) for fields in changes.values()) - cells_updated,
+        'changes': changed
+    }
+
+
+def seed_target_rules():
+    # Store DEFAULT_TARGET_RULES unless rules exist already; the caller commits
+    if db.session.query(TargetRule.id).first() is None:
+        db.session.bulk_insert_mappings(TargetRule, [
+            {'post': post, 'field': field, 'value': value} for post, field, value in DEFAULT_TARGET_RULES
+        ])
+
+
+def target_rule_values():
+    """The SET clause that applies the stored target rules: {field: value expression}.
+
+    Each field with rules becomes a CASE on the intern's post, falling back to
+    the rule without a post, or to the current value when there is none.
+    Fields without rules are left out.
+    """
+    rules = {}
+    for post, field, value in db.session.query(TargetRule.post, TargetRule.field, TargetRule.value):
+        if field not in TARGET_FIELDS:
+            raise ValueError(f"Unknown target field '{field}' in target rules")
+        rules.setdefault(field, {})[post] = value
+
+    values = {}
+    for field, by_post in rules.items():
+        default = by_post.pop(None, getattr(User, field))
+        values[field] = case(by_post, value=User.post, else_=default) if by_post else default
+    return values
+
+
+def apply_target_rules():
+    """Re-target every intern from the target rules in a single UPDATE.
+
+    The database evaluates the rules; no User rows are loaded, however many
+    interns there are. The caller commits. Returns the number of interns updated.
+    """
+    values = target_rule_values()
+    if not values:
+        return 0
+    return User.query.filter_by(role='intern').update(values, synchronize_session=False)
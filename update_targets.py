@@ -1,7 +1,9 @@
 import os
 import sys
 from flask import Flask
-from models import db, User
+from models import db
+from targets import seed_target_rules, apply_target_rules
+from view_cache import bump_data_version
 
 # Create a minimal Flask app
 app = Flask(__name__)
@@ -13,30 +15,17 @@ def update_targets():
     with app.app_context():
         print("Updating targets for all interns...")
         
-        # Get all interns
-        interns = User.query.filter_by(role='intern').all()
+        # Make sure the rules table exists and holds the default rules
+        db.create_all()
+        seed_target_rules()
         
-        for intern in interns:
-            # Set TND total target to 10 for all interns
-            intern.tnd_total_target = 10
-            
-            # Set Category targets based on post
-            if intern.post == 'Human Resources':
-                # HR Interns: 10, 10, 5, 50
-                intern.recruitment_target = 10
-                intern.college_db_target = 10
-                intern.client_db_target = 5
-                intern.school_lead_db_target = 50
-            else:
-                # Other Interns: 0, 10, 5, 50
-                intern.recruitment_target = 0
-                intern.college_db_target = 10
-                intern.client_db_target = 5
-                intern.school_lead_db_target = 50
+        # Apply the target rules in a single UPDATE
+        updated = apply_target_rules()
         
-        # Commit changes
+        # Commit changes, then have every worker rebuild its cached views
         db.session.commit()
-        print(f"Updated targets for {len(interns)} interns.")
+        bump_data_version()
+        print(f"Updated targets for {updated} interns.")
 
 if __name__ == '__main__':
     update_targets()
\ No newline at end of file
@@ -0,0 +1,128 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from flask_login import UserMixin
+from models import db, User
+from shared_cache import shared_cache
+
+# Identities kept per worker process, and seconds before one is read again.
+# Each worker has its own cache; forget_users() reaches the others through a
+# generation in the shared cache, and changes made outside the app (scripts)
+# show once the entry expires.
+USER_CACHE_SIZE = 1024
+USER_CACHE_TTL = 60
+
+# Shared cache key holding a value that changes whenever any worker forgets users
+GENERATION_KEY = 'user-cache:generation'
+
+# User columns that requests read from current_user
+IDENTITY_COLUMNS = ['id', 'username', 'role', 'name', 'post', 'is_poc']
+
+
+class UserIdentity(UserMixin):
+    # Read-only stand-in for User as current_user; holds IDENTITY_COLUMNS only
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+    def __repr__(self):
+        return f'<UserIdentity {self.id} {self.username}>'
+
+
+class UserCache:
+    """Bounded LRU of user identities whose entries expire after `ttl` seconds.
+
+    Safe to share between a worker's threads. Counts hits and misses so the
+    hit rate can be reported (see stats).
+    """
+
+    def __init__(self, max_size=USER_CACHE_SIZE, ttl=USER_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._shared_generation = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id, load):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+
+        # Load outside the lock; unknown users are not cached, nor rows read
+        # before an invalidation that happened while loading
+        identity = load(user_id)
+        if identity is not None:
+            with self._lock:
+                if generation != self._generation:
+                    return identity
+                self._entries[user_id] = (now + self.ttl, identity)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return identity
+
+    def invalidate(self, user_ids=None):
+        # Forget the given users (everyone when None)
+        with self._lock:
+            self._generation += 1
+            if user_ids is None:
+                self._entries.clear()
+                return
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def sync(self, shared_generation):
+        # Forget everyone if users were invalidated anywhere since the last call
+        with self._lock:
+            if shared_generation == self._shared_generation:
+                return
+            self._shared_generation = shared_generation
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None
+            }
+
+
+user_cache = UserCache()
+
+
+def load_identity(user_id):
+    row = db.session.query(*[getattr(User, column) for column in IDENTITY_COLUMNS]) \
+        .filter(User.id == user_id).first()
+    return UserIdentity(**row._asdict()) if row else None
+
+
+def cached_user(user_id):
+    # Identity of a logged-in user for Flask-Login's user_loader
+    user_cache.sync(shared_cache().peek(GENERATION_KEY, default=None))
+    return user_cache.get(user_id, load_identity)
+
+
+def forget_users(user_ids=None):
+    """Drop cached identities after users change (all of them when None).
+
+    Other workers forget every identity on their next lookup. Call once the
+    change is committed, so a concurrent request cannot cache the old row again.
+    """
+    user_cache.invalidate(user_ids)
+    shared_cache().set(GENERATION_KEY, 0, uuid.uuid4().hex)
@@ -0,0 +1,173 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from sqlalchemy.exc import IntegrityError
+from models import db, DataVersion
+from shared_cache import shared_cache, MISSING
+
+# View contexts kept per worker process, in front of the shared cache
+VIEW_CACHE_SIZE = 32
+
+# Seconds a worker's claim to build a view lasts; others build it themselves after that
+BUILD_TIMEOUT = 30
+
+# Seconds between checks for a view another worker is building
+BUILD_POLL_INTERVAL = 0.05
+
+# The DataVersion row
+VERSION_ID = 1
+
+
+def data_version():
+    # Current data version, or None before the first write; read on every cached view
+    # so writes in other workers count too
+    return db.session.query(DataVersion.version).filter_by(id=VERSION_ID).scalar()
+
+
+def data_epoch():
+    # When this database's version row was created, or None before the first write
+    return db.session.query(DataVersion.epoch).filter_by(id=VERSION_ID).scalar()
+
+
+def bump_data_version():
+    """Move the data version on, so every worker rebuilds its cached views.
+
+    Call after the write is committed. The bump runs in its own short
+    transaction, so it never holds the version row for the length of a
+    write (an import, say); a view built between the commit and the bump
+    already sees the new data. Versions start from the time the row is
+    created, so a recreated database never reuses the versions, and cached
+    views, of the one before it.
+    """
+    table = DataVersion.__table__
+    for _ in range(2):
+        try:
+            with db.engine.begin() as connection:
+                bumped = connection.execute(
+                    table.update().where(table.c.id == VERSION_ID).values(version=table.c.version + 1)
+                ).rowcount
+                if not bumped:
+                    created = time.time_ns() // 1000000
+                    connection.execute(table.insert().values(id=VERSION_ID, version=created, epoch=created))
+            return
+        except IntegrityError:
+            # Another worker created the row first; bump that one
+            continue
+
+
+def plain_rows(query):
+    """The rows of a column query as dicts of plain values, for cached contexts.
+
+    Contexts are shared between requests and workers, so they never hold ORM
+    instances; dates and times become ISO strings.
+    """
+    return [{key: value.isoformat() if isinstance(value, (date, datetime)) else value
+             for key, value in row._asdict().items()} for row in query]
+
+
+class ViewCache:
+    """LRU of view contexts, each stored with the data version it was built from.
+
+    Behind it sits the shared cache (shared_cache.py), so a context built by
+    one worker is loaded by the others instead of being built again.
+    Single-flight: while one thread builds a context, other requests for the
+    same key wait for it instead of building their own copy, and workers
+    claim a build in the shared cache so only one of them runs it.
+    """
+
+    def __init__(self, max_size=VIEW_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._building = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+
+    def get(self, key, version, build):
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == version:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+
+                building = self._building.get(key)
+                if building is None:
+                    building = self._building[key] = threading.Event()
+                    self.misses += 1
+                    break
+                self.waits += 1
+
+            # Someone else is building this view; use theirs once it is done
+            building.wait()
+
+        try:
+            value = self._load(':'.join(str(part) for part in key), version, build)
+            with self._lock:
+                self._entries[key] = (version, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+            return value
+        finally:
+            with self._lock:
+                del self._building[key]
+            building.set()
+
+    def _load(self, name, version, build):
+        # The shared copy of a context, waiting for a worker that is building it, or a fresh build.
+        # Only builds count as misses in the shared cache's stats.
+        store = shared_cache()
+        value = store.peek(name, version)
+        while value is MISSING:
+            if store.claim_build(name, version, BUILD_TIMEOUT):
+                try:
+                    value = build()
+                    store.set(name, version, value)
+                finally:
+                    store.release_build(name, version)
+                store.count(name, hit=False)
+                return value
+
+            # Another worker is building it; its claim lapses if that worker dies
+            time.sleep(BUILD_POLL_INTERVAL)
+            value = store.peek(name, version)
+
+        store.count(name, hit=True)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'waits': self.waits,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None
+            }
+
+
+view_cache = ViewCache()
+
+
+def cached_view(name, build, *key):
+    """Template context of view `name`, built by `build()` only when the data changed.
+
+    Contexts are keyed by name, `key` and today's date (views show today's
+    numbers). Nothing is cached before the first write. A context is shared
+    by every request and worker that reads it, so `build` returns plain data
+    only (dicts, lists, numbers, strings; see plain_rows), never ORM objects.
+    """
+    version = data_version()
+    if version is None:
+        return build()
+    return view_cache.get((name, date.today()) + key, version, build)